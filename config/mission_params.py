@@ -2,20 +2,89 @@
 class MissionParams:
     def __init__(self):
         # Shape parameters
-        self.shape_type = "circle"  # "circle", "triangle", or "square"
+        self.shape_type = "circle"  # "circle", "triangle", "square", or "polygon"
         self.radius_m = 500  # Distance from center to edge in meters
+        self.field_polygon = []  # Outline for "polygon", (x, y) meter offsets east/north of the start position
+        self.fields = []  # Several fields in one sortie: dicts with 'lat', 'lon' and any shape/pattern overrides
         
         # Pattern parameters
         self.pattern_type = "spiral_out"  # "zigzag", "spiral_out", or "spiral_in"
         self.stripe_separation_m = 100  # Distance between passes in meters
         self.rotation_deg = 45  # Rotation angle in degrees
+        self.auto_pattern = False  # Pick pattern_type and rotation_deg with the lowest estimated flight time
+        self.optimize_stripe_order = False  # Reorder zigzag stripes to cut transit distance
+        self.return_to_start = True  # End the mission back at the start position
+        
+        # Vehicle parameters
+        self.cruise_speed_ms = 15  # Cruise ground speed in m/s
+        self.turn_rate_dps = 30  # Heading change rate in turns, degrees per second
+        self.climb_rate_ms = 3  # Climb rate in m/s
+        self.sink_rate_ms = 2  # Sink rate in m/s
+        self.hover_speed_ms = 5  # Horizontal speed while flying as a multirotor in m/s
+        self.transition_time_s = 20  # Time for each QuadPlane hover/forward flight transition
+        self.cruise_power_w = 350  # Power draw in forward flight in watts
+        self.hover_power_w = 1500  # Power draw while hovering in watts
+        self.turn_radius_m = 0  # Minimum turn radius in meters, 0 for multirotors
+        self.dubins_turns = False  # Fly zigzag turns as Dubins/bulb paths at turn_radius_m (fixed-wing)
+        self.acceptance_radius_m = 10  # Waypoint acceptance radius, spacing of the turn path waypoints
+        self.speed_schedule = False  # Add DO_CHANGE_SPEED items: fast stripes and transit, slow turns
+        self.stripe_speed_ms = 18  # Ground speed along spray stripes in m/s
+        self.transit_speed_ms = 22  # Ground speed in transit with the spray off in m/s
+        self.turn_speed_ms = 12  # Ground speed through turns in m/s
+        self.straight_min_m = 150  # Straight runs shorter than this are flown at turn speed
+        self.battery_endurance_s = 1500  # Flight time on one battery in seconds
+        self.battery_reserve = 0.2  # Fraction of the endurance kept in reserve
+        self.max_mission_items = 700  # Mission item limit of the autopilot
         
         # Spray parameters
         self.enable_spray = False  # Set to False to disable spray points
         self.spray_interval_m = 50  # Distance between spray triggers in meters
         self.servo_channel = 6  # PWM output channel
         self.servo_pwm = 1900  # PWM value for spray ON (1100-1900)
+        self.servo_pwm_off = 1100  # PWM value for spray OFF across exclusion zones
+        self.spray_width_m = 100  # Swath width sprayed on the ground in meters
+        self.analyze_coverage = False  # Report coverage, overlap and gaps of the planned path before upload
+        self.coverage_cell_m = 0.5  # Cell size of the coverage analysis grid in meters
+        self.track_coverage = False  # After upload, follow telemetry and print the area sprayed so far
+        
+        # Exclusion zones (buildings, trees, power lines)
+        self.exclusion_zones = []  # Polygons as lists of (x, y) meter offsets east/north of the start position
+        self.exclusion_cell_m = 50  # Grid cell size of the exclusion zone index in meters
+        
+        # Geofence and rally points
+        self.geofence = []  # Fence polygon as (x, y) meter offsets east/north of the start position, checked before upload
+        self.upload_fence = False  # Upload a fence (geofence, or one generated around the field) and rally points
+        self.fence_margin_m = 50  # Distance of the generated fence outside the field in meters
+        self.rally_count = 4  # Rally points spread around the fence, in addition to one at home
         
         # MAVLink parameters
         self.altitude = 30  # Mission altitude in meters
-        self.connection_string = 'udp:localhost:14603'
\ No newline at end of file
+        self.terrain_dir = None  # Folder of SRTM .hgt tiles to hold altitude above ground, None for above home
+        self.terrain_spacing_m = 30  # Terrain sampling interval along each leg in meters
+        self.terrain_tolerance_m = 2  # Ground profile bend that gets its own waypoint in meters
+        self.terrain_cache_tiles = 8  # Number of DEM tiles kept open
+        self.connection_string = 'udp:localhost:14603'
+        self.track_progress = False  # After upload, follow telemetry and print percent complete, remaining distance and ETA
+        self.resume_mission = False  # Restart the mission from the leg nearest to where spraying stopped
+        self.resume_position = None  # (lat, lon) where spraying stopped, None to read it from the newest .tlog in tlog_dir
+        self.resume_mode = 'trim'  # 'trim' to upload the rest of the mission, 'set_current' to jump within the mission already on board
+        self.resume_reach_timeout_s = 300  # With 'set_current', how long to wait for the jump target before turning the spray on
+        self.telemetry_connection_string = 'udp:127.0.0.1:14550'  # Connection of the telemetry service, or a .tlog to replay
+        self.tlog_dir = None  # Folder the telemetry service records .tlog files (with a .idx index) to, None to disable
+        self.extract_dir = 'extracted'  # Folder run_extract_tlogs.py writes NumPy columns to
+        self.extract_processes = None  # Worker processes for tlog extraction, None for one per core
+        self.extract_memmap = False  # One .npy per column (opens with mmap_mode='r') instead of one .npz per tlog
+        self.replay_speed = 1.0  # Replay speed of a .tlog telemetry_connection_string, None for as fast as possible
+        self.telemetry_max_rate_hz = 10  # Most telemetry pushes per second to dashboard clients
+        self.router_master = 'tcp:127.0.0.1:5887'  # Connection run_router.py reads SITL (or the autopilot) from
+        self.router_outputs = [  # Endpoints run_router.py fans the master out to, as MAVProxy --out connection strings
+            'udp:127.0.0.1:14550',
+            'udp:127.0.0.1:14552',
+            'udp:localhost:14601',
+            'udpin:localhost:14602',
+            'udpout:localhost:14603',
+            'udpbcast:192.168.2.255:14700'
+        ]
+        self.shared_state_name = 'mavlink_vehicle_state'  # Shared memory the telemetry service publishes vehicle state to, None to disable
+        self.fleet_connection_strings = []  # One connection per vehicle to split the field across a fleet
+        self.fleet_balance = "time"  # "time" (estimated flight time incl. transit) or "count" (stripes)
\ No newline at end of file
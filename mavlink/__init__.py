@@ -1,3 +1,22 @@
 from .mission_handler import MissionHandler
+from .mission_builder import mission_item, build_mission_items, build_fence_items, build_rally_items
+from .mission_validator import MissionValidationError, validate_mission
+from .telemetry import TelemetryListener
+from .broadcast import TelemetryHub
+from .dispatcher import MessageDispatcher
+from .commander import CommandError, VehicleCommander
+from .router import MavlinkRouter
+from .shared_state import VehicleState, VehicleStatePublisher, VehicleStateReader
+from .tlog import TlogRecorder, TlogReader, ReplayConnection, build_index
+from .extract import extract_tlog, extract_tlogs, flight_fields
 
-__all__ = ['MissionHandler']
\ No newline at end of file
+__all__ = [
+    'MissionHandler',
+    'mission_item', 'build_mission_items', 'build_fence_items', 'build_rally_items',
+    'MissionValidationError', 'validate_mission',
+    'TelemetryListener', 'TelemetryHub', 'MessageDispatcher', 'MavlinkRouter',
+    'CommandError', 'VehicleCommander',
+    'VehicleState', 'VehicleStatePublisher', 'VehicleStateReader',
+    'TlogRecorder', 'TlogReader', 'ReplayConnection', 'build_index',
+    'extract_tlog', 'extract_tlogs', 'flight_fields'
+]
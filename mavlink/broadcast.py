@@ -0,0 +1,136 @@
+import json
+import struct
+from collections import deque
+
+FIELD_FORMAT = struct.Struct('<Hd')  # Key index, value
+
+def flatten(data, prefix=''):
+    """{'gyro': {'x': 1}} -> {'gyro.x': 1}"""
+    flat = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+class TelemetryHub:
+    """Push-based fan-out of telemetry state and log lines to many async clients.
+
+    Producer threads call publish() and append_logs(). Updates are merged
+    and flushed on the event loop at most max_rate_hz times per second, and
+    only when something changed, so idle clients cost nothing. Every client
+    waits on one shared future per flush. Each client tracks the state it
+    has already sent, so a slow client skips stale updates and still gets a
+    correct delta. Log entries are kept as given and turned into text by
+    format_log only once a log client reads them, once per entry.
+    """
+
+    def __init__(self, max_rate_hz=10, log_size=100, format_log=str):
+        self.interval = 1 / max_rate_hz
+        self.format_log = format_log
+        self.state = {}
+        self.pending = {}
+        self.logs = deque(maxlen=log_size)
+        self.log_seq = 0
+        self.pending_logs = []
+        self.keys = []
+        self.key_index = {}
+        self.loop = None
+        self.flush_handle = None
+        self.last_flush = 0
+        self.updated = None
+        self.clients = 0
+
+    def attach(self, loop):
+        """Bind to the event loop the clients run on"""
+        self.loop = loop
+        self.updated = loop.create_future()
+
+    def publish(self, values):
+        """Thread-safe: merge new values; nested dicts are flattened to dotted keys"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._merge, flatten(values), ())
+
+    def append_logs(self, entries):
+        """Thread-safe: queue log entries (formatted later with format_log) for every log client"""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._merge, {}, entries)
+
+    def _merge(self, values, entries):
+        self.pending.update(values)
+        self.pending_logs.extend(entries)
+        if self.flush_handle is None:
+            due = max(self.loop.time(), self.last_flush + self.interval)
+            self.flush_handle = self.loop.call_at(due, self._flush)
+
+    def _flush(self):
+        self.flush_handle = None
+        self.last_flush = self.loop.time()
+        changed = {key: value for key, value in self.pending.items() if self.state.get(key) != value}
+        self.pending = {}
+        for entry in self.pending_logs[-self.logs.maxlen:]:
+            self.log_seq += 1
+            self.logs.append([self.log_seq, entry, None])
+        new_logs = bool(self.pending_logs)
+        self.pending_logs = []
+        if not changed and not new_logs:
+            return
+        for key in changed:
+            if key not in self.key_index:
+                self.key_index[key] = len(self.keys)
+                self.keys.append(key)
+        self.state.update(changed)
+        updated, self.updated = self.updated, self.loop.create_future()
+        updated.set_result(None)
+
+    async def state_deltas(self):
+        """Full state first, then only the keys that changed since this client's last update"""
+        sent = {}
+        self.clients += 1
+        try:
+            while True:
+                delta = {key: value for key, value in self.state.items() if sent.get(key) != value}
+                if delta:
+                    sent.update(delta)
+                    yield delta
+                await self.updated
+        finally:
+            self.clients -= 1
+
+    async def log_lines(self):
+        """Log lines as they arrive, the retained ones first"""
+        last_seq = 0
+        self.clients += 1
+        try:
+            while True:
+                lines = [self._log_text(log) for log in self.logs if log[0] > last_seq]
+                if self.logs:
+                    last_seq = self.logs[-1][0]
+                if lines:
+                    yield lines
+                await self.updated
+        finally:
+            self.clients -= 1
+
+    def _log_text(self, log):
+        if log[2] is None:
+            log[2] = self.format_log(log[1])
+        return log[2]
+
+    def encode_json(self, delta):
+        return json.dumps(delta, separators=(',', ':'))
+
+    def encode_binary(self, delta, known_keys):
+        """Numeric fields packed as (key index, float64) pairs, the rest as JSON.
+
+        Returns the key table additions (for a text frame, or None), the
+        binary frame (or None) and the JSON of non-numeric fields (or None).
+        """
+        new_keys = self.keys[known_keys:] or None
+        numeric = [(self.key_index[key], value) for key, value in delta.items()
+                   if isinstance(value, (int, float)) and not isinstance(value, bool)]
+        other = {key: value for key, value in delta.items()
+                 if not isinstance(value, (int, float)) or isinstance(value, bool)}
+        frame = b''.join(FIELD_FORMAT.pack(index, value) for index, value in numeric) or None
+        return new_keys, frame, (self.encode_json(other) if other else None)
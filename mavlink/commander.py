@@ -0,0 +1,159 @@
+import time
+from pymavlink import mavutil
+
+FORCE_DISARM = 21196  # MAV_CMD_COMPONENT_ARM_DISARM param2 that disarms in flight
+ARMED = mavutil.mavlink.MAV_MODE_FLAG_SAFETY_ARMED
+
+class CommandError(RuntimeError):
+    """Raised when the vehicle rejects a command or never reaches the requested state"""
+
+class VehicleCommander:
+    """Arms, changes mode, takes off, flies and lands a vehicle, one confirmed step at a time.
+
+    Every step registers on the dispatcher for the COMMAND_ACK or state
+    (heartbeat mode and arming, altitude, landed state) that confirms it
+    before sending, and returns as soon as that arrives. A command without
+    an ack is sent again with the confirmation counter raised. Only
+    heartbeats from the vehicle's own component count, not those of a
+    companion computer or camera in the same system. The mode mapping is
+    looked up once, from the first of them.
+    """
+
+    def __init__(self, master, dispatcher, target_system=1, target_component=1, ack_timeout=1.0, retries=3):
+        self.master = master
+        self.dispatcher = dispatcher
+        self.target_system = target_system
+        self.target_component = target_component
+        self.ack_timeout = ack_timeout
+        self.retries = retries
+        self._modes = None
+        # Holds only the newest heartbeat of the vehicle
+        self._heartbeats = dispatcher.subscribe('HEARTBEAT', condition=self._is_vehicle, maxsize=1)
+        self._heartbeat = None
+
+    @property
+    def modes(self):
+        if not self._modes:
+            msg = self.heartbeat()
+            if msg.autopilot == mavutil.mavlink.MAV_AUTOPILOT_PX4:
+                self._modes = mavutil.px4_map
+            else:
+                self._modes = mavutil.mode_mapping_byname(msg.type) or {}
+        return self._modes
+
+    def mode_id(self, mode):
+        if mode not in self.modes:
+            raise CommandError(f"Unknown mode {mode}, try {', '.join(self.modes)}")
+        return self.modes[mode]
+
+    def _is_vehicle(self, msg):
+        return msg.get_srcSystem() == self.target_system and msg.get_srcComponent() == self.target_component
+
+    def heartbeat(self, timeout=2):
+        """Latest heartbeat of the vehicle, waiting for one only if none has arrived yet"""
+        msg = self._heartbeats.get(0 if self._heartbeat is not None else timeout)
+        if msg is not None:
+            self._heartbeat = msg
+        if self._heartbeat is None:
+            raise CommandError("No heartbeat from the vehicle")
+        return self._heartbeat
+
+    def command(self, command, *params, timeout=None, retries=None):
+        """Send a COMMAND_LONG until it is acknowledged; returns the accepting COMMAND_ACK"""
+        timeout = self.ack_timeout if timeout is None else timeout
+        retries = self.retries if retries is None else retries
+        params = (list(params) + [0] * 7)[:7]
+        condition = lambda msg: msg.command == command and self._is_vehicle(msg)
+        with self.dispatcher.subscribe('COMMAND_ACK', condition=condition) as acks:
+            for confirmation in range(retries + 1):
+                self.master.mav.command_long_send(
+                    self.target_system, self.target_component, command, confirmation, *params)
+                deadline = time.time() + timeout
+                while True:
+                    ack = acks.get(max(deadline - time.time(), 0))
+                    if ack is None:
+                        break  # Lost on the way there or back; send again
+                    if ack.result == mavutil.mavlink.MAV_RESULT_ACCEPTED:
+                        return ack
+                    if ack.result == mavutil.mavlink.MAV_RESULT_IN_PROGRESS:
+                        deadline = time.time() + timeout
+                        continue
+                    raise CommandError(f"{mavutil.mavlink.enums['MAV_CMD'][command].name} rejected: "
+                                       f"{mavutil.mavlink.enums['MAV_RESULT'][ack.result].name}")
+        raise CommandError(f"No ack for {mavutil.mavlink.enums['MAV_CMD'][command].name} "
+                           f"after {retries + 1} attempts")
+
+    def wait_for(self, types, condition, timeout, description):
+        """First message of the vehicle meeting condition, registered before any command is sent"""
+        msg = self.dispatcher.wait(types, timeout, condition=lambda msg: self._is_vehicle(msg) and condition(msg))
+        if msg is None:
+            raise CommandError(f"Timed out after {timeout} s waiting for {description}")
+        return msg
+
+    def _confirmed(self, types, condition, timeout, description, command, *params):
+        # The state may change before the ack arrives, so listen for it first
+        state = self.dispatcher.expect(types, condition=lambda msg: self._is_vehicle(msg) and condition(msg))
+        try:
+            self.command(command, *params)
+            msg = state.get(timeout)
+        finally:
+            state.close()
+        if msg is None:
+            raise CommandError(f"Timed out after {timeout} s waiting for {description}")
+        return msg
+
+    def arm(self, timeout=10):
+        if self.heartbeat().base_mode & ARMED:
+            return
+        self._confirmed('HEARTBEAT', lambda msg: msg.base_mode & ARMED, timeout, "arming",
+                        mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM, 1)
+
+    def disarm(self, force=False, timeout=10):
+        if not self.heartbeat().base_mode & ARMED:
+            return
+        self._confirmed('HEARTBEAT', lambda msg: not msg.base_mode & ARMED, timeout, "disarming",
+                        mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM, 0, FORCE_DISARM if force else 0)
+
+    def set_mode(self, mode, timeout=5):
+        mode_id = self.mode_id(mode)
+        if self.heartbeat().custom_mode == mode_id:
+            return
+        self._confirmed('HEARTBEAT', lambda msg: msg.custom_mode == mode_id, timeout, f"mode {mode}",
+                        mavutil.mavlink.MAV_CMD_DO_SET_MODE, mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED, mode_id)
+
+    def wait_altitude(self, altitude, timeout=60, tolerance=0.9):
+        """Block until the vehicle is at least tolerance of altitude (meters above home)"""
+        return self.wait_for('GLOBAL_POSITION_INT', lambda msg: msg.relative_alt / 1000 >= altitude * tolerance,
+                             timeout, f"{altitude} m")
+
+    def takeoff(self, altitude, vtol=True, timeout=60):
+        """Take off to altitude meters above home and wait until it is reached"""
+        command = mavutil.mavlink.MAV_CMD_NAV_VTOL_TAKEOFF if vtol else mavutil.mavlink.MAV_CMD_NAV_TAKEOFF
+        self._confirmed('GLOBAL_POSITION_INT', lambda msg: msg.relative_alt / 1000 >= altitude * 0.9, timeout,
+                        f"{altitude} m", command, 0, 0, 0, 0, 0, 0, altitude)
+
+    def start_mission(self, timeout=5):
+        """Start the uploaded mission; ArduPilot switches to AUTO"""
+        auto = self.mode_id('AUTO')
+        self._confirmed('HEARTBEAT', lambda msg: msg.custom_mode == auto, timeout, "mode AUTO",
+                        mavutil.mavlink.MAV_CMD_MISSION_START)
+
+    def wait_landed(self, timeout=120):
+        """Block until the vehicle reports being on the ground or has disarmed itself"""
+        self.wait_for(['EXTENDED_SYS_STATE', 'HEARTBEAT'],
+                      lambda msg: (msg.landed_state == mavutil.mavlink.MAV_LANDED_STATE_ON_GROUND
+                                   if msg.get_type() == 'EXTENDED_SYS_STATE' else not msg.base_mode & ARMED),
+                      timeout, "landing")
+
+    def land(self, mode='QLAND', timeout=120):
+        self.set_mode(mode)
+        self.wait_landed(timeout)
+
+    def run(self, steps):
+        """Run (method name, args...) steps in order; returns the seconds each one took"""
+        timings = []
+        for name, *args in steps:
+            started = time.time()
+            getattr(self, name)(*args)
+            timings.append((name, time.time() - started))
+        return timings
@@ -0,0 +1,122 @@
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+class Subscription:
+    """Queue of the messages matching one route, filled by the dispatcher"""
+
+    def __init__(self, dispatcher, types, sysid=None, condition=None, maxsize=0):
+        self.dispatcher = dispatcher
+        self.types = (types,) if isinstance(types, str) else tuple(types)
+        self.sysid = sysid
+        self.condition = condition
+        self.queue = queue.Queue(maxsize)
+
+    def matches(self, msg):
+        if self.sysid is not None and msg.get_srcSystem() != self.sysid:
+            return False
+        return self.condition is None or self.condition(msg)
+
+    def deliver(self, msg):
+        try:
+            self.queue.put_nowait(msg)
+        except queue.Full:
+            # Drop the oldest so a slow consumer keeps seeing new messages
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.queue.put_nowait(msg)
+        return True
+
+    def get(self, timeout=None):
+        """Next message, or None after timeout seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.dispatcher.remove(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Expectation(Subscription):
+    """Future resolved by the first matching message"""
+
+    def __init__(self, dispatcher, types, sysid=None, condition=None):
+        super().__init__(dispatcher, types, sysid, condition)
+        self.future = Future()
+
+    def deliver(self, msg):
+        if not self.future.done():
+            self.future.set_result(msg)
+        return False
+
+    def get(self, timeout=None):
+        try:
+            return self.future.result(timeout)
+        except FutureTimeout:  # Not the builtin before Python 3.11
+            return None
+        finally:
+            self.close()
+
+class MessageDispatcher:
+    """Routes the messages of one TelemetryListener to many consumers.
+
+    The listener stays the only reader of the connection. Each consumer
+    registers a route by message type, optionally narrowed by source system
+    ID and a condition, and gets its own queue (subscribe) or a one-shot
+    future (expect). Register the route before sending the request it
+    answers, so a fast reply can't be missed.
+    """
+
+    def __init__(self, listener):
+        self.listener = listener
+        self.routes = {}
+        self.lock = threading.Lock()
+        listener.subscribe(self.dispatch)
+
+    def add(self, route):
+        with self.lock:
+            for msg_type in route.types:
+                self.routes.setdefault(msg_type, []).append(route)
+        return route
+
+    def remove(self, route):
+        with self.lock:
+            for msg_type in route.types:
+                routes = self.routes.get(msg_type, [])
+                if route in routes:
+                    routes.remove(route)
+
+    def subscribe(self, types, sysid=None, condition=None, maxsize=0):
+        """Subscription queueing every matching message until closed"""
+        return self.add(Subscription(self, types, sysid, condition, maxsize))
+
+    def expect(self, types, sysid=None, condition=None):
+        """Expectation whose get(timeout) returns the first matching message"""
+        return self.add(Expectation(self, types, sysid, condition))
+
+    def wait(self, types, timeout=None, sysid=None, condition=None):
+        """First matching message from now on, or None after timeout seconds"""
+        return self.expect(types, sysid, condition).get(timeout)
+
+    def dispatch(self, batch):
+        with self.lock:
+            routes = {msg_type: list(entries) for msg_type, entries in self.routes.items() if entries}
+        if not routes:
+            return
+        finished = []
+        for msg in batch:
+            for route in routes.get(msg.get_type(), ()):
+                if route in finished or not route.matches(msg):
+                    continue
+                if not route.deliver(msg):
+                    finished.append(route)
+        for route in finished:
+            self.remove(route)
@@ -0,0 +1,119 @@
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from pymavlink.dialects.v20 import ardupilotmega
+from .router import MAVLINK2_STX
+from .tlog import INDEX_DTYPE, MESSAGE_IDS, index_path, build_index
+
+CHUNK_ROWS = 1 << 16  # Frames gathered at once, bounding the temporary index arrays
+NUMPY_TYPES = {
+    'd': '<f8', 'f': '<f4', 'Q': '<u8', 'q': '<i8', 'I': '<u4', 'i': '<i4',
+    'H': '<u2', 'h': '<i2', 'B': 'u1', 'b': 'i1', 'c': 'S1', '?': '?'
+}
+
+def payload_dtype(msg_type):
+    """Numpy record type laid out like the wire payload of a message type"""
+    message = ardupilotmega.mavlink_map[MESSAGE_IDS[msg_type]]
+    fields = []
+    for name, (count, code) in zip(message.ordered_fieldnames,
+                                   re.findall(r'(\d*)([a-zA-Z?])', message.unpacker.format[1:])):
+        if code == 's':
+            fields.append((name, f'S{count or 1}'))
+        elif count and int(count) > 1:
+            fields.append((name, NUMPY_TYPES[code], (int(count),)))
+        else:
+            fields.append((name, NUMPY_TYPES[code]))
+    return np.dtype(fields)
+
+def gather_payloads(data, offsets, size):
+    """(len(offsets), size) bytes of the payloads of the frames at offsets, zero padded"""
+    payloads = np.zeros((len(offsets), size), dtype=np.uint8)
+    positions = np.arange(size)
+    for first in range(0, len(offsets), CHUNK_ROWS):
+        chunk = offsets[first:first + CHUNK_ROWS]
+        # MAVLink 2 drops trailing zero bytes of the payload; the gap reads as zero
+        start = chunk + np.where(data[chunk] == MAVLINK2_STX, 10, 6)
+        lengths = np.minimum(data[chunk + 1], size)
+        inside = (positions < lengths[:, None]) & (start[:, None] + positions < len(data))
+        cells = np.where(inside, start[:, None] + positions, 0)
+        payloads[first:first + CHUNK_ROWS] = np.where(inside, data[cells], 0)
+    return payloads
+
+def flight_fields(params):
+    """Message fields worth a time series after a spray sortie"""
+    return {
+        'GLOBAL_POSITION_INT': ['lat', 'lon', 'alt', 'relative_alt', 'hdg'],
+        'SERVO_OUTPUT_RAW': [f'servo{params.servo_channel}_raw'],
+        'MISSION_CURRENT': ['seq'],
+        'MISSION_ITEM_REACHED': ['seq']
+    }
+
+def extract_tlog(path, fields):
+    """Columns of the requested {message type: [field, ...]} from one tlog.
+
+    Frames of each requested type are found through the tlog index (built
+    on the first run) and their payloads are gathered into one array and
+    viewed as the wire layout, so no message is decoded in Python. Values
+    keep the units of the MAVLink fields. Returns {'TYPE.field': array}
+    plus 'TYPE.time_us' per type, and the number of messages in the tlog.
+    """
+    if os.path.exists(index_path(path)):
+        index = np.fromfile(index_path(path), dtype=INDEX_DTYPE)
+    else:
+        index = build_index(path)
+    data = np.memmap(path, dtype=np.uint8, mode='r') if os.path.getsize(path) else np.empty(0, np.uint8)
+    index = index[index['offset'] + 10 <= len(data)]
+
+    columns = {}
+    for msg_type, names in fields.items():
+        dtype = payload_dtype(msg_type)
+        rows = index[index['msgid'] == MESSAGE_IDS[msg_type]]
+        payloads = gather_payloads(data, rows['offset'].astype(np.int64), dtype.itemsize)
+        records = payloads.view(dtype).ravel()
+        columns[f'{msg_type}.time_us'] = rows['time_us']
+        for name in names:
+            columns[f'{msg_type}.{name}'] = records[name]
+    return columns, len(index)
+
+def save_columns(columns, output, memmap=False):
+    """Write columns to output.npz, or with memmap to one .npy per column in the output folder.
+
+    The .npy files open with np.load(path, mmap_mode='r') without reading
+    them into memory.
+    """
+    if not memmap:
+        np.savez(output, **columns)
+        return output + '.npz'
+    os.makedirs(output, exist_ok=True)
+    for name, column in columns.items():
+        np.save(os.path.join(output, name + '.npy'), column)
+    return output
+
+def _extract_one(job):
+    path, fields, output_dir, memmap = job
+    started = time.process_time()
+    columns, messages = extract_tlog(path, fields)
+    output = os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0])
+    output = save_columns(columns, output, memmap)
+    return {
+        'path': path,
+        'output': output,
+        'messages': messages,
+        'rows': sum(len(column) for name, column in columns.items() if name.endswith('.time_us')),
+        'cpu_s': time.process_time() - started
+    }
+
+def extract_tlogs(paths, fields, output_dir, processes=None, memmap=False):
+    """Extract many tlogs in parallel, one tlog per task.
+
+    Workers write their own outputs and return only a summary, so no column
+    crosses the process boundary. Returns the summaries in input order.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(path, fields, output_dir, memmap) for path in paths]
+    if processes == 1 or len(jobs) <= 1:
+        return [_extract_one(job) for job in jobs]
+    with ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(_extract_one, jobs))
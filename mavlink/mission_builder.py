@@ -0,0 +1,63 @@
+from pymavlink import mavutil
+
+def mission_item(seq, command, x=0, y=0, z=0, param1=0, param2=0, param3=0, param4=0, is_spray=False):
+    return {
+        'seq': seq,
+        'frame': mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT,
+        'command': command,
+        'current': 0,
+        'autocontinue': 1,
+        'param1': param1,
+        'param2': param2,
+        'param3': param3,
+        'param4': param4,
+        'x': x,
+        'y': y,
+        'z': z,
+        'is_spray': is_spray
+    }
+
+def build_mission_items(waypoints, spray_commands, params):
+    """Turn global waypoints and (seq, position, on) spray commands into mission items"""
+    sprays_by_seq = {}
+    for spray_seq, spray_pos, spray_on in spray_commands:
+        sprays_by_seq.setdefault(spray_seq, []).append((spray_pos, spray_on))
+    
+    mission_items = []
+    for i, wp in enumerate(waypoints):
+        mission_items.append(mission_item(
+            len(mission_items),
+            mavutil.mavlink.MAV_CMD_NAV_WAYPOINT,
+            wp[0], wp[1], wp[2]
+        ))
+        
+        for spray_pos, spray_on in sprays_by_seq.get(i, ()):
+            mission_items.append(mission_item(
+                len(mission_items),
+                mavutil.mavlink.MAV_CMD_DO_SET_SERVO,
+                spray_pos[0], spray_pos[1], spray_pos[2],
+                param1=params.servo_channel,
+                param2=params.servo_pwm if spray_on else params.servo_pwm_off,
+                is_spray=True
+            ))
+    
+    return mission_items
+
+def build_fence_items(vertices):
+    """One inclusion polygon from global (lat, lon) vertices, as fence mission items"""
+    return [
+        dict(mission_item(
+            seq,
+            mavutil.mavlink.MAV_CMD_NAV_FENCE_POLYGON_VERTEX_INCLUSION,
+            lat, lon,
+            param1=len(vertices)
+        ), frame=mavutil.mavlink.MAV_FRAME_GLOBAL)
+        for seq, (lat, lon) in enumerate(vertices)
+    ]
+
+def build_rally_items(points):
+    """Rally mission items for global (lat, lon, altitude) points"""
+    return [
+        mission_item(seq, mavutil.mavlink.MAV_CMD_NAV_RALLY_POINT, lat, lon, alt)
+        for seq, (lat, lon, alt) in enumerate(points)
+    ]
@@ -1,16 +1,47 @@
 from pymavlink import mavutil
 import time
+from config import MissionParams
+from .mission_builder import mission_item
+from .mission_validator import MissionValidationError, validate_mission
+from .telemetry import TelemetryListener
+from .dispatcher import MessageDispatcher
+from .commander import VehicleCommander
+
+MISSION_TYPE_NAMES = {
+    mavutil.mavlink.MAV_MISSION_TYPE_MISSION: 'mission',
+    mavutil.mavlink.MAV_MISSION_TYPE_FENCE: 'fence',
+    mavutil.mavlink.MAV_MISSION_TYPE_RALLY: 'rally'
+}
 
 class MissionHandler:
-    def __init__(self, connection_string):
+    def __init__(self, connection_string, params=None):
+        self.params = params if params is not None else MissionParams()  # Limits uploads are validated against
         self.master = mavutil.mavlink_connection(connection_string)
         print("Waiting for heartbeat...")
         self.master.wait_heartbeat()
         print("Heartbeat received!")
         self.target_system = 1
         self.target_component = 1
+        # The listener thread is the only reader; everything else waits on the dispatcher
+        self.listener = TelemetryListener(self.master).start()
+        self.dispatcher = MessageDispatcher(self.listener)
+        self.commander = VehicleCommander(self.master, self.dispatcher, self.target_system, self.target_component)
+
+    def validate(self, mission_items, fence=None):
+        """validate_mission against self.params, raising MissionValidationError instead of returning a failed report"""
+        report = validate_mission(mission_items, self.params, fence)
+        if not report['ok']:
+            raise MissionValidationError(report)
+        return report
 
-    def upload_mission(self, mission_items):
+    def upload_mission(self, mission_items, validate=True, fence=None):
+        """Upload mission items, after validating them (and their NAV items against fence) unless validate=False"""
+        if validate:
+            self.validate(mission_items, fence)
+        with self.dispatcher.subscribe(['MISSION_REQUEST', 'WAYPOINT_REQUEST']) as requests:
+            self._upload_mission(mission_items, requests)
+
+    def _upload_mission(self, mission_items, requests):
         self.master.waypoint_clear_all_send()
         print("Cleared existing mission.")
         
@@ -22,10 +53,8 @@ class MissionHandler:
         max_retries = 3  # Maximum retries for same waypoint request
         
         while True:
-            # Use a short timeout for recv_match to prevent hanging
-            msg = self.master.recv_match(type=['MISSION_REQUEST', 'WAYPOINT_REQUEST'], 
-                                       blocking=True,
-                                       timeout=0.5)  # Short timeout
+            # Use a short timeout to prevent hanging
+            msg = requests.get(timeout=0.5)
             
             if msg is None:
                 if last_seq == len(mission_items) - 1:
@@ -78,4 +107,160 @@ class MissionHandler:
             self.target_component, 
             mavutil.mavlink.MAV_MISSION_ACCEPTED
         )
-        print("Mission uploaded successfully!")
\ No newline at end of file
+        print("Mission uploaded successfully!")
+
+    def send_item(self, seq, item, mission_type=mavutil.mavlink.MAV_MISSION_TYPE_MISSION, as_int=False):
+        """Send one item as MISSION_ITEM, or MISSION_ITEM_INT with lat/lon in 1e-7 degrees"""
+        if as_int:
+            self.master.mav.mission_item_int_send(
+                self.target_system,
+                self.target_component,
+                seq,
+                item['frame'],
+                item['command'],
+                item['current'],
+                item['autocontinue'],
+                item['param1'],
+                item['param2'],
+                item['param3'],
+                item['param4'],
+                int(round(item['x'] * 1e7)),
+                int(round(item['y'] * 1e7)),
+                item['z'],
+                mission_type
+            )
+        else:
+            self.master.mav.mission_item_send(
+                self.target_system,
+                self.target_component,
+                seq,
+                item['frame'],
+                item['command'],
+                item['current'],
+                item['autocontinue'],
+                item['param1'],
+                item['param2'],
+                item['param3'],
+                item['param4'],
+                item['x'],
+                item['y'],
+                item['z'],
+                mission_type
+            )
+
+    def download_mission(self, timeout=2, retries=3):
+        """Mission items on the vehicle, in the format the mission builder produces.
+
+        Each request is sent again after timeout seconds without a reply, up
+        to retries times; raises RuntimeError if a reply never comes, rather
+        than return part of the mission.
+        """
+        mission_items = []
+        with self.dispatcher.subscribe(['MISSION_COUNT', 'MISSION_ITEM', 'MISSION_ITEM_INT'], self.target_system) as replies:
+            msg = self._request(
+                replies, lambda: self.master.mav.mission_request_list_send(self.target_system, self.target_component),
+                lambda msg: msg.get_type() == 'MISSION_COUNT', timeout, retries)
+            if msg is None:
+                raise RuntimeError("Vehicle did not report its mission count")
+            
+            for seq in range(msg.count):
+                msg = self._request(
+                    replies,
+                    lambda: self.master.mav.mission_request_int_send(self.target_system, self.target_component, seq),
+                    lambda msg: msg.get_type() != 'MISSION_COUNT' and msg.seq == seq, timeout, retries)
+                if msg is None:
+                    raise RuntimeError(f"Mission item {seq} never arrived")
+                
+                scale = 1e7 if msg.get_type() == 'MISSION_ITEM_INT' else 1
+                item = mission_item(msg.seq, msg.command, msg.x / scale, msg.y / scale, msg.z,
+                                    msg.param1, msg.param2, msg.param3, msg.param4)
+                item['frame'] = msg.frame
+                mission_items.append(item)
+            
+            self.master.mav.mission_ack_send(
+                self.target_system, self.target_component, mavutil.mavlink.MAV_MISSION_ACCEPTED)
+        return mission_items
+
+    def _request(self, replies, send, matches, timeout, retries):
+        """First reply that matches, sending again after every timeout; None once retries run out"""
+        for _ in range(retries + 1):
+            send()
+            deadline = time.time() + timeout
+            msg = replies.get(timeout)
+            while msg is not None:
+                if matches(msg):
+                    return msg
+                msg = replies.get(max(deadline - time.time(), 0))
+        return None
+
+    def set_current(self, seq, timeout=3):
+        """Jump to mission item seq, confirmed by MISSION_CURRENT; raises RuntimeError if it never is"""
+        current = self.dispatcher.expect('MISSION_CURRENT', self.target_system, lambda msg: msg.seq == seq)
+        self.master.mav.mission_set_current_send(self.target_system, self.target_component, seq)
+        if current.get(timeout) is None:
+            raise RuntimeError(f"Vehicle did not switch to mission item {seq}")
+
+    def upload_all(self, mission_items, fence_items=(), rally_items=(), timeout=10, validate=True):
+        """Upload the survey, geofence and rally points in one session.
+
+        The counts of all three mission types go out together and item
+        requests are answered in whatever order they arrive, so the three
+        handshakes overlap instead of running back to back. Finishes when the
+        vehicle has acknowledged every type. Unless validate=False, the mission
+        is first checked against the fence it goes up with. Raises
+        RuntimeError on a rejected upload or when the vehicle goes quiet for
+        timeout seconds.
+        """
+        if validate:
+            self.validate(mission_items, [(item['x'], item['y']) for item in fence_items] or None)
+        if not self.master.mavlink20():
+            raise RuntimeError("Uploading several mission types needs a MAVLink 2 connection")
+        uploads = {mavutil.mavlink.MAV_MISSION_TYPE_MISSION: mission_items}
+        if fence_items:
+            uploads[mavutil.mavlink.MAV_MISSION_TYPE_FENCE] = fence_items
+        if rally_items:
+            uploads[mavutil.mavlink.MAV_MISSION_TYPE_RALLY] = rally_items
+        
+        with self.dispatcher.subscribe(['MISSION_REQUEST', 'MISSION_REQUEST_INT', 'MISSION_ACK']) as replies:
+            self._upload_all(uploads, replies, timeout)
+        self.master.waypoint_set_current_send(0)
+        print("Set first waypoint as current.")
+        print("Mission, fence and rally points uploaded successfully!")
+
+    def _upload_all(self, uploads, replies, timeout):
+        # No MISSION_CLEAR_ALL: each MISSION_COUNT replaces its list, and the
+        # clear's MISSION_ACK would read as the end of the mission upload
+        for mission_type, items in uploads.items():
+            self.master.mav.mission_count_send(
+                self.target_system, self.target_component, len(items), mission_type)
+            print(f"Sent {MISSION_TYPE_NAMES[mission_type]} count: {len(items)}")
+        
+        pending = set(uploads)
+        requested = set()
+        last_heard = time.time()
+        while pending:
+            msg = replies.get(timeout=0.5)
+            if msg is None:
+                if time.time() - last_heard > timeout:
+                    names = ', '.join(MISSION_TYPE_NAMES[t] for t in pending)
+                    raise RuntimeError(f"Upload timed out waiting for: {names}")
+                continue
+            last_heard = time.time()
+            
+            mission_type = getattr(msg, 'mission_type', mavutil.mavlink.MAV_MISSION_TYPE_MISSION)
+            if mission_type not in pending:
+                continue
+            if msg.get_type() == 'MISSION_ACK':
+                accepted = msg.type == mavutil.mavlink.MAV_MISSION_ACCEPTED
+                if accepted and mission_type not in requested:
+                    continue  # Nothing requested yet, so left over from an earlier transaction
+                if not accepted:
+                    raise RuntimeError(f"Vehicle rejected the {MISSION_TYPE_NAMES[mission_type]} upload ({msg.type})")
+                pending.discard(mission_type)
+                print(f"{MISSION_TYPE_NAMES[mission_type].capitalize()} accepted.")
+                continue
+            
+            requested.add(mission_type)
+            items = uploads[mission_type]
+            if msg.seq < len(items):
+                self.send_item(msg.seq, items[msg.seq], mission_type, msg.get_type() == 'MISSION_REQUEST_INT')
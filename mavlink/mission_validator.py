@@ -0,0 +1,90 @@
+import numpy as np
+from pymavlink import mavutil
+from patterns import points_in_polygon
+
+PWM_MIN = 1000
+PWM_MAX = 2000
+SERVO_CHANNELS = 16
+SPEED_UNCHANGED = -1
+
+class MissionValidationError(ValueError):
+    """Raised instead of uploading a mission that failed validation"""
+
+    def __init__(self, report):
+        self.report = report
+        super().__init__("; ".join(issue['message'] for issue in report['errors']))
+
+def _issue(check, mask, seq, message):
+    bad = seq[mask]
+    shown = ', '.join(str(s) for s in bad[:10].tolist()) + (', ...' if len(bad) > 10 else '')
+    return {'check': check, 'seq': bad.tolist(), 'message': f"{message}: item {shown}"}
+
+def validate_mission(mission_items, params, fence=None):
+    """Check built mission items before any of them go over the radio.
+
+    All checks run as array operations over one pass of the items: item
+    count, sequence numbers, finite and in-range coordinates, servo channel
+    and PWM range, speed changes, altitude and, if fence holds (lat, lon)
+    vertices, NAV positions outside it. Returns a report dict with 'ok',
+    'count', and 'errors' and 'warnings' lists of {'check', 'seq', 'message'}.
+    """
+    count = len(mission_items)
+    fields = np.array([
+        (item['seq'], item['command'], item['param1'], item['param2'], item['x'], item['y'], item['z'])
+        for item in mission_items
+    ], dtype=float).reshape(count, 7)
+    seq, command, param1, param2, x, y, z = fields.T
+    seq_index = np.arange(count)
+    errors, warnings = [], []
+
+    if count > params.max_mission_items:
+        errors.append({'check': 'item_count', 'seq': [],
+                       'message': f"{count} items exceed max_mission_items ({params.max_mission_items})"})
+    if count == 0:
+        errors.append({'check': 'item_count', 'seq': [], 'message': "Mission is empty"})
+
+    bad_seq = seq != seq_index
+    if bad_seq.any():
+        errors.append(_issue('sequence', bad_seq, seq_index, "Sequence numbers out of order"))
+
+    not_finite = ~np.isfinite(fields[:, 2:]).all(axis=1)
+    if not_finite.any():
+        errors.append(_issue('coordinates', not_finite, seq_index, "NaN or infinite values"))
+
+    is_nav = command < mavutil.mavlink.MAV_CMD_NAV_LAST
+    positioned = is_nav & (command != mavutil.mavlink.MAV_CMD_NAV_RETURN_TO_LAUNCH) & ~not_finite
+    out_of_range = positioned & ((np.abs(x) > 90) | (np.abs(y) > 180))
+    if out_of_range.any():
+        errors.append(_issue('coordinates', out_of_range, seq_index, "Latitude or longitude out of range"))
+
+    is_servo = command == mavutil.mavlink.MAV_CMD_DO_SET_SERVO
+    bad_channel = is_servo & ((param1 < 1) | (param1 > SERVO_CHANNELS))
+    if bad_channel.any():
+        errors.append(_issue('servo', bad_channel, seq_index, f"Servo channel outside 1-{SERVO_CHANNELS}"))
+    bad_pwm = is_servo & (param1 == params.servo_channel) & ((param2 < PWM_MIN) | (param2 > PWM_MAX))
+    if bad_pwm.any():
+        errors.append(_issue('servo', bad_pwm, seq_index,
+                             f"PWM on channel {params.servo_channel} outside {PWM_MIN}-{PWM_MAX}"))
+
+    is_speed = command == mavutil.mavlink.MAV_CMD_DO_CHANGE_SPEED
+    bad_speed = is_speed & (param2 <= 0) & (param2 != SPEED_UNCHANGED)
+    if bad_speed.any():
+        errors.append(_issue('speed', bad_speed, seq_index, "Non-positive speed"))
+
+    low = positioned & (command == mavutil.mavlink.MAV_CMD_NAV_WAYPOINT) & (z <= 0)
+    if low.any():
+        warnings.append(_issue('altitude', low, seq_index, "Waypoint at or below home altitude"))
+
+    if fence is not None and len(fence) >= 3:
+        fence = np.asarray(fence, dtype=float)
+        outside = np.zeros(count, dtype=bool)
+        outside[positioned] = ~points_in_polygon(np.column_stack((x, y))[positioned], fence)
+        if outside.any():
+            errors.append(_issue('geofence', outside, seq_index, "Waypoint outside the geofence"))
+
+    return {
+        'ok': not errors,
+        'count': count,
+        'errors': errors,
+        'warnings': warnings
+    }
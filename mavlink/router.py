@@ -0,0 +1,335 @@
+import re
+import selectors
+import socket
+import struct
+import time
+from collections import Counter
+from pymavlink.dialects.v20 import ardupilotmega
+
+MAVLINK1_STX = 0xFE
+MAVLINK2_STX = 0xFD
+MAVLINK1_OVERHEAD = 8  # Header and checksum
+MAVLINK2_OVERHEAD = 12
+MAVLINK2_SIGNED = 0x01
+SIGNATURE_LENGTH = 13
+MAX_BACKLOG = 1 << 20  # Bytes queued for a slow TCP peer before frames are dropped
+COUNTERS = ('rx_packets', 'rx_bytes', 'rx_skipped_bytes', 'tx_packets', 'tx_bytes', 'tx_dropped')
+STREAM_READ = 4096  # Largest TCP read, which bounds the datagrams forwarded to UDP peers
+READS_PER_WAKEUP = 256  # Reads drained from one socket before the others get a turn
+
+def target_offsets(mavlink_map=ardupilotmega.mavlink_map):
+    """{msgid: (target_system offset, target_component offset or None)} in the wire payload"""
+    offsets = {}
+    for msgid, message in mavlink_map.items():
+        tokens = re.findall(r'\d*[a-zA-Z?]', message.unpacker.format[1:])
+        starts = [struct.calcsize('<' + ''.join(tokens[:i])) for i in range(len(tokens))]
+        fields = dict(zip(message.ordered_fieldnames, starts))
+        if 'target_system' in fields:
+            offsets[msgid] = (fields['target_system'], fields.get('target_component'))
+    return offsets
+
+def split_frames(buffer, start, end):
+    """Complete frames in buffer[start:end] as (start, end, sysid, compid, msgid, payload start, payload length).
+
+    Only the header is read. Bytes before a start marker are skipped.
+    Returns the frames, where the incomplete tail begins and the count of
+    skipped bytes.
+    """
+    frames = []
+    skipped = 0
+    while start < end:
+        stx = buffer[start]
+        if stx == MAVLINK2_STX:
+            if end - start < 10:
+                break
+            length = buffer[start + 1]
+            size = length + MAVLINK2_OVERHEAD
+            if buffer[start + 2] & MAVLINK2_SIGNED:
+                size += SIGNATURE_LENGTH
+            if end - start < size:
+                break
+            msgid = buffer[start + 7] | buffer[start + 8] << 8 | buffer[start + 9] << 16
+            frames.append((start, start + size, buffer[start + 5], buffer[start + 6], msgid, start + 10, length))
+        elif stx == MAVLINK1_STX:
+            if end - start < 6:
+                break
+            length = buffer[start + 1]
+            size = length + MAVLINK1_OVERHEAD
+            if end - start < size:
+                break
+            frames.append((start, start + size, buffer[start + 3], buffer[start + 4], buffer[start + 5], start + 6, length))
+        else:
+            skipped += 1
+            start += 1
+            continue
+        start += size
+    return frames, start, skipped
+
+class Endpoint:
+    """One side of the router: a UDP or TCP socket with its counters.
+
+    Connection strings follow pymavlink/MAVProxy: udp/udpout:host:port sends
+    to an address, udpin:host:port listens and answers the last sender,
+    udpbcast:address:port broadcasts, tcp:host:port connects and
+    tcpin:host:port accepts clients.
+    """
+
+    def __init__(self, name, connection_string, buffer_size=1 << 16, sock=None):
+        self.name = name
+        self.connection_string = connection_string
+        kind, host, port = connection_string.split(':')
+        self.address = (host, int(port))
+        self.kind = kind
+        self.stream = kind in ('tcp', 'tcpin')
+        self.peer = None
+        self.backlog = bytearray()
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.filled = 0
+        self.writing = False
+        self.counters = Counter()
+
+        if sock is not None:
+            # A client accepted by a tcpin endpoint
+            self.sock = sock
+            self.peer = self.address
+        elif kind == 'tcp':
+            self.sock = socket.create_connection(self.address)
+        elif kind == 'tcpin':
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.sock.bind(self.address)
+            self.sock.listen()
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+            if kind == 'udpin':
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                self.sock.bind(self.address)
+            elif kind == 'udpbcast':
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+                self.peer = self.address
+            elif kind in ('udp', 'udpout'):
+                self.peer = self.address
+            else:
+                raise ValueError(f"Unsupported router connection: {connection_string}")
+        self.sock.setblocking(False)
+        if kind == 'tcp':
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def receive(self):
+        """Read what is waiting; returns the filled length of self.buffer, 0 when closed"""
+        if self.stream:
+            count = self.sock.recv_into(self.view[self.filled:self.filled + STREAM_READ])
+            if count == 0:
+                return 0
+            self.filled += count
+        else:
+            count, sender = self.sock.recvfrom_into(self.buffer)
+            if self.kind == 'udpin':
+                self.peer = sender
+            self.filled = count
+        self.counters['rx_bytes'] += count
+        return self.filled
+
+    def keep_tail(self, start):
+        """Move an incomplete stream frame to the front of the buffer"""
+        tail = self.filled - start
+        if tail and start:
+            self.buffer[:tail] = self.buffer[start:self.filled]
+        self.filled = tail if self.stream else 0
+
+    def send(self, data, packets):
+        if self.peer is None and not self.stream:
+            return
+        try:
+            if not self.stream:
+                self.sock.sendto(data, self.peer)
+            elif self.backlog:
+                self.queue(data, packets)
+                return
+            else:
+                sent = self.sock.send(data)
+                if sent < len(data):
+                    self.backlog += data[sent:]
+        except (BlockingIOError, InterruptedError):
+            self.queue(data, packets)
+            return
+        except OSError:
+            # Nobody listening yet on a UDP port; count it and carry on
+            self.counters['tx_dropped'] += packets
+            return
+        self.counters['tx_packets'] += packets
+        self.counters['tx_bytes'] += len(data)
+
+    def queue(self, data, packets):
+        if len(self.backlog) + len(data) > MAX_BACKLOG:
+            self.counters['tx_dropped'] += packets
+        else:
+            self.backlog += data
+            self.counters['tx_packets'] += packets
+            self.counters['tx_bytes'] += len(data)
+
+    def flush(self):
+        """Write queued bytes of a slow stream peer; True once the backlog is empty"""
+        try:
+            sent = self.sock.send(self.backlog)
+        except (BlockingIOError, InterruptedError):
+            return False
+        del self.backlog[:sent]
+        return not self.backlog
+
+    def close(self):
+        self.sock.close()
+
+class MavlinkRouter:
+    """Forwards raw MAVLink frames between endpoints, MAVProxy --out style.
+
+    Only frame headers are parsed: the source system and component teach the
+    router which endpoint each vehicle or ground station sits behind, and the
+    target_system/target_component bytes (located with a per-message offset
+    table) send targeted messages only there. Everything else goes to every
+    endpoint but the one it came from. Runs of consecutive frames bound for
+    the same endpoints are forwarded as one memoryview slice of the receive
+    buffer, without copying or re-encoding.
+    """
+
+    def __init__(self, connection_strings, names=None):
+        names = names or [f"{i}:{connection}" for i, connection in enumerate(connection_strings)]
+        self.endpoints = []
+        self.systems = {}  # sysid -> endpoints it was heard on
+        self.components = {}  # (sysid, compid) -> endpoints
+        self.offsets = target_offsets()
+        self.selector = selectors.DefaultSelector()
+        self.running = False
+        self.started = time.time()
+        for name, connection_string in zip(names, connection_strings):
+            self.add(Endpoint(name, connection_string))
+
+    def add(self, endpoint):
+        self.endpoints.append(endpoint)
+        self.selector.register(endpoint.sock, selectors.EVENT_READ, endpoint)
+        return endpoint
+
+    def remove(self, endpoint):
+        self.selector.unregister(endpoint.sock)
+        self.endpoints.remove(endpoint)
+        for routes in (self.systems, self.components):
+            for endpoints in routes.values():
+                endpoints.discard(endpoint)
+        endpoint.close()
+
+    def accept(self, listener):
+        sock, (host, port) = listener.sock.accept()
+        self.add(Endpoint(f"{listener.name}<{host}:{port}>", f"tcp:{host}:{port}", len(listener.buffer), sock))
+
+    def destinations(self, source, sysid, compid, msgid, payload, length, buffer):
+        """Endpoints a frame goes to, learning where its sender lives"""
+        self.systems.setdefault(sysid, set()).add(source)
+        self.components.setdefault((sysid, compid), set()).add(source)
+        targets = None
+        offsets = self.offsets.get(msgid)
+        if offsets is not None:
+            # MAVLink 2 trims trailing zero bytes, so a missing byte reads as 0 (broadcast)
+            system_offset, component_offset = offsets
+            target_system = buffer[payload + system_offset] if system_offset < length else 0
+            target_component = 0
+            if component_offset is not None and component_offset < length:
+                target_component = buffer[payload + component_offset]
+            if target_system:
+                if target_component:
+                    targets = self.components.get((target_system, target_component))
+                if not targets:
+                    targets = self.systems.get(target_system)
+        if targets:
+            return tuple(endpoint for endpoint in targets if endpoint is not source)
+        return tuple(endpoint for endpoint in self.endpoints if endpoint is not source and endpoint.kind != 'tcpin')
+
+    def forward(self, source):
+        """Forward what one read returns; False once the endpoint closed"""
+        end = source.receive()
+        if end == 0:
+            self.remove(source)
+            return False
+        frames, tail, skipped = split_frames(source.buffer, 0, end)
+        source.counters['rx_packets'] += len(frames)
+        source.counters['rx_skipped_bytes'] += skipped
+        run_start = run_end = None
+        run_targets = None
+        run_packets = 0
+        for start, stop, sysid, compid, msgid, payload, length in frames:
+            targets = self.destinations(source, sysid, compid, msgid, payload, length, source.buffer)
+            if targets == run_targets and start == run_end:
+                run_end = stop
+                run_packets += 1
+                continue
+            if run_targets:
+                for endpoint in run_targets:
+                    endpoint.send(source.view[run_start:run_end], run_packets)
+            run_start, run_end, run_targets, run_packets = start, stop, targets, 1
+        if run_targets:
+            for endpoint in run_targets:
+                endpoint.send(source.view[run_start:run_end], run_packets)
+        source.keep_tail(tail)
+        return True
+
+    def run(self, duration=None, report=None, report_interval=5):
+        """Route until stop() or for duration seconds; report(stats) is called every report_interval"""
+        self.running = True
+        deadline = None if duration is None else time.time() + duration
+        next_report = time.time() + report_interval
+        while self.running:
+            for key, events in self.selector.select(timeout=0.5):
+                endpoint = key.data
+                if endpoint not in self.endpoints:
+                    continue  # Closed earlier in this round
+                try:
+                    if events & selectors.EVENT_WRITE and endpoint.flush():
+                        endpoint.writing = False
+                        self.selector.modify(endpoint.sock, selectors.EVENT_READ, endpoint)
+                    if events & selectors.EVENT_READ:
+                        if endpoint.kind == 'tcpin':
+                            self.accept(endpoint)
+                        else:
+                            # Drain what is queued, one datagram or stream read at a time
+                            for _ in range(READS_PER_WAKEUP):
+                                if not self.forward(endpoint):
+                                    break
+                except (BlockingIOError, InterruptedError):
+                    pass
+                except ConnectionError:
+                    # UDP sockets report unreachable peers this way on some systems
+                    if endpoint.stream:
+                        self.remove(endpoint)
+            for endpoint in self.endpoints:
+                if endpoint.backlog and not endpoint.writing:
+                    endpoint.writing = True
+                    self.selector.modify(endpoint.sock, selectors.EVENT_READ | selectors.EVENT_WRITE, endpoint)
+            now = time.time()
+            if report is not None and now >= next_report:
+                report(self.stats())
+                next_report = now + report_interval
+            if deadline is not None and now >= deadline:
+                break
+        self.running = False
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        """Counters of every endpoint, with packet rates since the router started"""
+        elapsed = max(time.time() - self.started, 1e-9)
+        return {
+            endpoint.name: dict(
+                {key: endpoint.counters[key] for key in COUNTERS},
+                rx_rate=endpoint.counters['rx_packets'] / elapsed,
+                tx_rate=endpoint.counters['tx_packets'] / elapsed,
+                backlog=len(endpoint.backlog)
+            )
+            for endpoint in self.endpoints
+        }
+
+    def close(self):
+        for endpoint in list(self.endpoints):
+            self.remove(endpoint)
+        self.selector.close()
@@ -0,0 +1,133 @@
+import struct
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory, resource_tracker
+
+SERVO_CHANNELS = 16
+STATE_FIELDS = (
+    'time',
+    # GLOBAL_POSITION_INT, degrees, meters and m/s
+    'lat', 'lon', 'alt', 'relative_alt', 'vx', 'vy', 'vz', 'hdg',
+    # ATTITUDE, radians and rad/s
+    'roll', 'pitch', 'yaw', 'rollspeed', 'pitchspeed', 'yawspeed',
+    # VFR_HUD
+    'airspeed', 'groundspeed', 'heading', 'throttle', 'vfr_alt', 'climb',
+    # MISSION_CURRENT
+    'mission_seq',
+    # SERVO_OUTPUT_RAW, PWM
+) + tuple(f'servo{channel}' for channel in range(1, SERVO_CHANNELS + 1))
+FLOAT_FIELDS = STATE_FIELDS.index('mission_seq')
+STATE_FORMAT = struct.Struct(f'<{FLOAT_FIELDS}di{SERVO_CHANNELS}H')
+SEQUENCE = struct.Struct('<Q')
+STATE_SIZE = SEQUENCE.size + STATE_FORMAT.size
+
+VehicleState = namedtuple('VehicleState', STATE_FIELDS)
+
+def attach(name):
+    """Open an existing segment without this process owning (and unlinking) it"""
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        # Before Python 3.13 every attach is tracked and unlinked at exit, so skip the registration
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name)
+        finally:
+            resource_tracker.register = register
+
+class VehicleStatePublisher:
+    """Writes the latest vehicle state into shared memory for other processes.
+
+    Subscribe it to a TelemetryListener; each batch is decoded once and
+    written as one fixed struct behind a sequence counter (a seqlock). The
+    counter is odd while a write is in progress, so readers never see a
+    half-written state and the writer never waits for them.
+    """
+
+    def __init__(self, name, listener=None):
+        try:
+            self.shm = shared_memory.SharedMemory(name, create=True, size=STATE_SIZE)
+        except FileExistsError:
+            # Left over by a publisher that did not shut down cleanly (maybe with an older
+            # layout): unlink it and start a fresh one this process owns. A tracked attach
+            # keeps the resource tracker's register and unregister balanced
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name, create=True, size=STATE_SIZE)
+        self.buffer = self.shm.buf
+        self.values = [0.0] * FLOAT_FIELDS + [-1] + [0] * SERVO_CHANNELS
+        self.sequence = 0
+        self.write()
+        self.listener = listener
+        if listener is not None:
+            listener.subscribe(self.handle_batch)
+
+    def handle_batch(self, batch):
+        changed = False
+        for msg in batch:
+            changed = self.update(msg) or changed
+        if changed:
+            self.write()
+
+    def update(self, msg):
+        msg_type = msg.get_type()
+        values = self.values
+        if msg_type == 'GLOBAL_POSITION_INT':
+            values[1:9] = (msg.lat / 1e7, msg.lon / 1e7, msg.alt / 1000, msg.relative_alt / 1000,
+                           msg.vx / 100, msg.vy / 100, msg.vz / 100, msg.hdg / 100)
+        elif msg_type == 'ATTITUDE':
+            values[9:15] = (msg.roll, msg.pitch, msg.yaw, msg.rollspeed, msg.pitchspeed, msg.yawspeed)
+        elif msg_type == 'VFR_HUD':
+            values[15:21] = (msg.airspeed, msg.groundspeed, msg.heading, msg.throttle, msg.alt, msg.climb)
+        elif msg_type == 'MISSION_CURRENT':
+            values[21] = msg.seq
+        elif msg_type == 'SERVO_OUTPUT_RAW':
+            values[22:] = [getattr(msg, f'servo{channel}_raw', 0) for channel in range(1, SERVO_CHANNELS + 1)]
+        else:
+            return False
+        return True
+
+    def write(self):
+        self.values[0] = time.time()
+        SEQUENCE.pack_into(self.buffer, 0, self.sequence + 1)
+        STATE_FORMAT.pack_into(self.buffer, SEQUENCE.size, *self.values)
+        self.sequence += 2
+        SEQUENCE.pack_into(self.buffer, 0, self.sequence)
+
+    def close(self, unlink=True):
+        if self.listener is not None:
+            self.listener.unsubscribe(self.handle_batch)
+        self.buffer = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+class VehicleStateReader:
+    """Reads the state published by a VehicleStatePublisher in another process"""
+
+    def __init__(self, name):
+        self.shm = attach(name)
+        self.buffer = self.shm.buf
+
+    def read(self, timeout=0.1):
+        """Consistent VehicleState; retries while the publisher is mid-write"""
+        deadline = None
+        while True:
+            before, = SEQUENCE.unpack_from(self.buffer, 0)
+            if not before & 1:
+                values = STATE_FORMAT.unpack_from(self.buffer, SEQUENCE.size)
+                after, = SEQUENCE.unpack_from(self.buffer, 0)
+                if before == after:
+                    return tuple.__new__(VehicleState, values)
+            # The publisher may have been descheduled mid-write; let it finish
+            if deadline is None:
+                deadline = time.perf_counter() + timeout
+            elif time.perf_counter() > deadline:
+                raise TimeoutError("Vehicle state kept changing while being read")
+            time.sleep(0)
+
+    def close(self):
+        self.buffer = None
+        self.shm.close()
@@ -0,0 +1,119 @@
+import socket
+import threading
+import time
+from collections import deque, Counter
+
+class TelemetryListener:
+    """Reads a MAVLink connection on its own thread and keeps recent history.
+
+    The thread blocks in select() on the connection's socket and, once data
+    arrives, drains every complete message before blocking again, so bursts
+    are handled as one batch with no polling delay. The newest history_size
+    messages of each type, and of all types together, stay in fixed-size
+    deques. Subscribers are called with every batch from the reader thread.
+    """
+
+    def __init__(self, connection, history_size=1000, log_size=100, receive_buffer=1 << 20):
+        self.connection = connection
+        # A larger socket buffer absorbs bursts while a batch is processed
+        port = getattr(connection, 'port', None)
+        if isinstance(port, socket.socket):
+            port.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+        self.history_size = history_size
+        self.history = {}
+        self.latest = {}
+        self.logs = deque(maxlen=log_size)
+        self.counts = Counter()
+        self.received = 0
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.thread = None
+        self.running = False
+
+        self.telemetry_data = {
+            "accelero": {"x": 0, "y": 0, "z": 0},
+            "gyro": {"x": 0, "y": 0, "z": 0},
+            "speed": 0,
+            "altitude": 0,
+            "heading": 0,
+        }
+
+    def subscribe(self, callback):
+        """Call callback(messages) with each batch of new messages"""
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+
+    def drain(self):
+        """Every message already received, without blocking"""
+        batch = []
+        while True:
+            msg = self.connection.recv_msg()
+            if msg is None:
+                return batch
+            if msg.get_type() != 'BAD_DATA':
+                batch.append(msg)
+
+    def run(self):
+        while self.running:
+            if not self.connection.select(0.5):
+                continue
+            batch = self.drain()
+            if batch:
+                self.handle_batch(batch)
+
+    def handle_batch(self, batch):
+        now = time.time()
+        with self.lock:
+            for msg in batch:
+                msg_type = msg.get_type()
+                history = self.history.get(msg_type)
+                if history is None:
+                    history = self.history[msg_type] = deque(maxlen=self.history_size)
+                history.append((now, msg))
+                self.latest[msg_type] = msg
+                self.counts[msg_type] += 1
+                self.update_telemetry(msg_type, msg)
+            self.logs.extend(batch)
+            self.received += len(batch)
+        for callback in list(self.subscribers):
+            callback(batch)
+
+    def update_telemetry(self, msg_type, msg):
+        if msg_type == "ATTITUDE":
+            self.telemetry_data["gyro"]["x"] = msg.rollspeed
+            self.telemetry_data["gyro"]["y"] = msg.pitchspeed
+            self.telemetry_data["gyro"]["z"] = msg.yawspeed
+        elif msg_type == "RAW_IMU":
+            self.telemetry_data["accelero"]["x"] = msg.xacc / 1000 * 9.80665  # mG to m/s²
+            self.telemetry_data["accelero"]["y"] = msg.yacc / 1000 * 9.80665
+            self.telemetry_data["accelero"]["z"] = msg.zacc / 1000 * 9.80665
+        elif msg_type == "GLOBAL_POSITION_INT":
+            self.telemetry_data["altitude"] = msg.alt / 1000  # Convert to meters
+            self.telemetry_data["heading"] = msg.hdg / 100  # Convert to degrees
+        elif msg_type == "VFR_HUD":
+            self.telemetry_data["speed"] = msg.groundspeed
+
+    def recent(self, msg_type, count=None):
+        """Newest (timestamp, message) pairs of one type, oldest first"""
+        with self.lock:
+            history = list(self.history.get(msg_type, ()))
+        return history if count is None else history[-count:]
+
+    def snapshot(self):
+        """Copy of the telemetry values"""
+        with self.lock:
+            return {key: dict(value) if isinstance(value, dict) else value
+                    for key, value in self.telemetry_data.items()}
@@ -0,0 +1,280 @@
+import mmap
+import os
+import struct
+import time
+import numpy as np
+from pymavlink.dialects.v20 import ardupilotmega
+from .mission_builder import mission_item
+from .router import MAVLINK1_STX, MAVLINK2_STX, MAVLINK1_OVERHEAD, MAVLINK2_OVERHEAD, MAVLINK2_SIGNED, SIGNATURE_LENGTH
+
+TIMESTAMP = struct.Struct('>Q')  # tlog record prefix, microseconds since the epoch
+INDEX_DTYPE = np.dtype([('time_us', '<u8'), ('offset', '<u8'), ('msgid', '<u4')])
+MESSAGE_IDS = {message.msgname: msgid for msgid, message in ardupilotmega.mavlink_map.items()}
+REPLAY_BATCH = 1000  # Most messages one drain gets when replaying faster than real time
+
+def index_path(tlog_path):
+    return tlog_path + '.idx'
+
+def frame_size(buffer, offset):
+    """Length of the MAVLink frame starting at offset, or None if no frame starts there"""
+    stx = buffer[offset]
+    if stx == MAVLINK2_STX:
+        return buffer[offset + 1] + MAVLINK2_OVERHEAD + (SIGNATURE_LENGTH if buffer[offset + 2] & MAVLINK2_SIGNED else 0)
+    if stx == MAVLINK1_STX:
+        return buffer[offset + 1] + MAVLINK1_OVERHEAD
+    return None
+
+def frame_msgid(buffer, offset):
+    if buffer[offset] == MAVLINK2_STX:
+        return buffer[offset + 7] | buffer[offset + 8] << 8 | buffer[offset + 9] << 16
+    return buffer[offset + 5]
+
+def build_index(tlog_path):
+    """Index a tlog recorded elsewhere (Mission Planner, MAVProxy) with one linear scan"""
+    entries = []
+    with open(tlog_path, 'rb') as f:
+        data = f.read()
+    offset = 0
+    while offset + TIMESTAMP.size + 8 <= len(data):
+        frame = offset + TIMESTAMP.size
+        size = frame_size(data, frame)
+        if size is None or frame + size > len(data):
+            offset += 1  # Resynchronise on the next plausible record
+            continue
+        entries.append((TIMESTAMP.unpack_from(data, offset)[0], frame, frame_msgid(data, frame)))
+        offset = frame + size
+    index = np.array(entries, dtype=INDEX_DTYPE)
+    index.tofile(index_path(tlog_path))
+    return index
+
+class TlogRecorder:
+    """Appends every message a TelemetryListener receives to a .tlog.
+
+    Records use the usual tlog layout (big-endian microsecond timestamp then
+    the raw frame), so Mission Planner and MAVProxy can open the file. A
+    sidecar .tlog.idx gets one fixed INDEX_DTYPE row per message (time,
+    frame offset, message ID), which TlogReader maps to seek without scanning.
+    """
+
+    def __init__(self, path, listener=None):
+        self.path = path
+        self.tlog = open(path, 'ab')
+        self.index = open(index_path(path), 'ab')
+        self.offset = self.tlog.tell()
+        self.listener = listener
+        if listener is not None:
+            listener.subscribe(self.handle_batch)
+
+    def handle_batch(self, batch):
+        now = int(time.time() * 1e6)
+        prefix = TIMESTAMP.pack(now)
+        records = []
+        index = np.empty(len(batch), dtype=INDEX_DTYPE)
+        offset = self.offset
+        for i, msg in enumerate(batch):
+            frame = msg.get_msgbuf()
+            records.append(prefix)
+            records.append(frame)
+            index[i] = (now, offset + TIMESTAMP.size, msg.get_msgId())
+            offset += TIMESTAMP.size + len(frame)
+        self.tlog.write(b''.join(records))
+        self.index.write(index.tobytes())
+        self.offset = offset
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.unsubscribe(self.handle_batch)
+        self.tlog.close()
+        self.index.close()
+
+class TlogReader:
+    """Random access to a recorded tlog through its index and mmap.
+
+    Time ranges and message types are selected on the index with numpy, and
+    only the selected frames are decoded, straight from the mapped file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if os.path.exists(index_path(path)):
+            index = np.fromfile(index_path(path), dtype=INDEX_DTYPE)
+        else:
+            index = build_index(path)
+        # The index can run ahead of a tlog cut short while recording
+        self.index = index[index['offset'] < len(self.data)]
+        self.parser = ardupilotmega.MAVLink(None)
+        self.parser.robust_parsing = True
+
+    @property
+    def start_time(self):
+        return self.index['time_us'][0] / 1e6 if len(self.index) else None
+
+    @property
+    def end_time(self):
+        return self.index['time_us'][-1] / 1e6 if len(self.index) else None
+
+    def select(self, start=None, end=None, types=None):
+        """Index rows between start and end (epoch seconds) of the given message type names"""
+        rows = self.index
+        if start is not None:
+            rows = rows[rows['time_us'] >= int(start * 1e6)]
+        if end is not None:
+            rows = rows[rows['time_us'] <= int(end * 1e6)]
+        if types is not None:
+            rows = rows[np.isin(rows['msgid'], [MESSAGE_IDS[name] for name in types])]
+        return rows
+
+    def decode(self, row):
+        offset = int(row['offset'])
+        frame = self.data[offset:offset + frame_size(self.data, offset)]
+        msg = self.parser.decode(bytearray(frame))
+        msg._timestamp = int(row['time_us']) / 1e6
+        return msg
+
+    def messages(self, start=None, end=None, types=None):
+        """Decoded messages in recorded order, with _timestamp set to the recording time"""
+        for row in self.select(start, end, types):
+            try:
+                yield self.decode(row)
+            except Exception:
+                continue  # Corrupt frame; skip it like a live link would
+
+    def mission_items(self, end=None):
+        """Items of the last complete mission transfer recorded up to end (epoch seconds), in either direction"""
+        count = None
+        received = {}
+        mission_items = []
+        for msg in self.messages(end=end, types=['MISSION_COUNT', 'MISSION_ITEM', 'MISSION_ITEM_INT']):
+            if getattr(msg, 'mission_type', 0) != ardupilotmega.MAV_MISSION_TYPE_MISSION:
+                continue
+            if msg.get_type() == 'MISSION_COUNT':
+                count, received = msg.count, {}
+                continue
+            if count is None or msg.seq >= count:
+                continue
+            received[msg.seq] = msg
+            if len(received) == count:
+                mission_items = []
+                for seq in range(count):
+                    item_msg = received[seq]
+                    scale = 1e7 if item_msg.get_type() == 'MISSION_ITEM_INT' else 1
+                    item = mission_item(seq, item_msg.command, item_msg.x / scale, item_msg.y / scale, item_msg.z,
+                                        item_msg.param1, item_msg.param2, item_msg.param3, item_msg.param4)
+                    item['frame'] = item_msg.frame
+                    mission_items.append(item)
+        return mission_items
+
+    def replay(self, speed=1.0, start=None, end=None, types=None):
+        return ReplayConnection(self, speed, start, end, types)
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+class ReplayConnection:
+    """Plays a tlog back through the calls a live pymavlink connection offers.
+
+    recv_msg() returns each message once its recorded time, scaled by speed,
+    has come (speed=None plays as fast as it can be read), and select()
+    sleeps until then, so TelemetryListener, MessageDispatcher and the
+    trackers built on them run unchanged. Anything sent is discarded, so
+    requests go unanswered; recorded_mission() stands in for a download.
+    """
+
+    def __init__(self, reader, speed=1.0, start=None, end=None, types=None):
+        self.reader = reader
+        self.speed = speed
+        self.rows = reader.select(start, end, types)
+        self.position = 0
+        self.mav = ardupilotmega.MAVLink(self)
+        self.target_system = 1
+        self.target_component = 1
+        self.started = None
+        times = self.rows['time_us']
+        self.offsets = (times - times[0]) / 1e6 if len(times) else np.empty(0)  # Seconds into the replay
+        self.burst = 0
+        self.messages = {}
+
+    def write(self, buffer):
+        pass
+
+    def mavlink20(self):
+        return True
+
+    def waypoint_request_list_send(self):
+        self.mav.mission_request_list_send(self.target_system, self.target_component)
+
+    def recorded_mission(self):
+        """The mission as last transferred before the current replay time"""
+        if self.position == 0:
+            return []
+        return self.reader.mission_items(end=self.rows['time_us'][self.position - 1] / 1e6)
+
+    def due_in(self):
+        """Seconds until the next message should be delivered; None when the replay is over"""
+        if self.position >= len(self.rows):
+            return None
+        if self.started is None:
+            self.started = time.time()
+        if not self.speed:
+            return 0
+        return self.offsets[self.position] / self.speed - (time.time() - self.started)
+
+    def select(self, timeout):
+        self.burst = 0
+        wait = self.due_in()
+        if wait is None:
+            time.sleep(timeout)
+            return False
+        if wait > timeout:
+            time.sleep(timeout)
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def recv_msg(self):
+        wait = self.due_in()
+        while wait is not None and wait <= 0 and self.burst < REPLAY_BATCH:
+            row = self.rows[self.position]
+            self.position += 1
+            self.burst += 1
+            try:
+                msg = self.reader.decode(row)
+            except Exception:
+                wait = self.due_in()
+                continue
+            self.messages[msg.get_type()] = msg
+            if msg.get_type() == 'HEARTBEAT':
+                self.target_system = msg.get_srcSystem()
+                self.target_component = msg.get_srcComponent()
+            return msg
+        return None
+
+    def recv_match(self, type=None, blocking=False, timeout=None):
+        types = (type,) if isinstance(type, str) else type
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            msg = self.recv_msg()
+            if msg is not None and (types is None or msg.get_type() in types):
+                return msg
+            if msg is None:
+                if not blocking or self.finished:
+                    return None
+                self.burst = 0
+                remaining = 0.1 if deadline is None else deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self.select(min(remaining, 0.1))
+
+    def wait_heartbeat(self, blocking=True, timeout=None):
+        return self.recv_match(type='HEARTBEAT', blocking=blocking, timeout=timeout)
+
+    @property
+    def finished(self):
+        return self.position >= len(self.rows)
+
+    def close(self):
+        pass
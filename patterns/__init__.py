@@ -1,11 +1,20 @@
-from .circle import generate_zigzag as circle_zigzag, generate_spiral as circle_spiral
-from .square import generate_zigzag as square_zigzag, generate_spiral as square_spiral
-from .triangle import generate_zigzag as triangle_zigzag, generate_spiral as triangle_spiral
+from .circle import generate_zigzag as circle_zigzag, generate_spiral as circle_spiral, outline as circle_outline
+from .square import generate_zigzag as square_zigzag, generate_spiral as square_spiral, outline as square_outline
+from .triangle import generate_zigzag as triangle_zigzag, generate_spiral as triangle_spiral, outline as triangle_outline
+from .polygon import generate_zigzag as polygon_zigzag, generate_spiral as polygon_spiral
 from .pattern_utils import *
+from .polygon import points_in_polygon, segment_crossings, polygon_area, convex_hull, offset_polygon, generate_stripes
+from .exclusion import ExclusionIndex, clip_path
+from .generator import PATTERN_TYPES, generate_pattern, field_outline
 
 __all__ = [
-    'circle_zigzag', 'circle_spiral',
-    'square_zigzag', 'square_spiral',
-    'triangle_zigzag', 'triangle_spiral',
-    'meters_to_degrees', 'rotate_point', 'calculate_distance_meters', 'add_spray_points'
-]
\ No newline at end of file
+    'circle_zigzag', 'circle_spiral', 'circle_outline',
+    'square_zigzag', 'square_spiral', 'square_outline',
+    'triangle_zigzag', 'triangle_spiral', 'triangle_outline',
+    'polygon_zigzag', 'polygon_spiral',
+    'meters_to_degrees', 'degrees_to_meters', 'project_local', 'unproject_local', 'haversine_matrix',
+    'rotate_point', 'calculate_distance_meters', 'add_spray_points',
+    'points_in_polygon', 'segment_crossings', 'polygon_area', 'convex_hull', 'offset_polygon', 'generate_stripes',
+    'ExclusionIndex', 'clip_path',
+    'PATTERN_TYPES', 'generate_pattern', 'field_outline'
+]
@@ -17,6 +17,10 @@ def generate_zigzag(radius_m, stripe_separation_m):
     waypoints.append((0, 0))
     return waypoints
 
+def outline(radius_m, num_points=64):
+    return [(radius_m * math.cos(2 * math.pi * i / num_points),
+             radius_m * math.sin(2 * math.pi * i / num_points)) for i in range(num_points)]
+
 def generate_spiral(radius_m, stripe_separation_m, direction="out"):
     waypoints = [(0, 0)]
     max_radius = radius_m
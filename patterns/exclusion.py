@@ -0,0 +1,108 @@
+import math
+import numpy as np
+from .polygon import points_in_polygon, segment_crossings
+
+class ExclusionIndex:
+    """Uniform grid over exclusion polygons, built once per mission.
+
+    Polygons are lists of (x, y) meter offsets in the same frame as the path
+    being clipped. Each grid cell lists the polygons whose bounding box touches
+    it, so a path leg only tests the handful of zones along its way.
+    """
+
+    def __init__(self, polygons, cell_size_m=50):
+        self.polygons = [np.asarray(p, dtype=float) for p in polygons if len(p) >= 3]
+        self.cell_size = float(cell_size_m)
+        self.cells = {}
+
+        for idx, polygon in enumerate(self.polygons):
+            i0, j0 = np.floor(polygon.min(axis=0) / self.cell_size).astype(int)
+            i1, j1 = np.floor(polygon.max(axis=0) / self.cell_size).astype(int)
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    self.cells.setdefault((i, j), []).append(idx)
+
+    def candidates(self, p1, p2):
+        """Indices of polygons whose grid cells the segment p1->p2 passes through"""
+        if not self.cells:
+            return []
+        p1 = np.asarray(p1, dtype=float)
+        p2 = np.asarray(p2, dtype=float)
+
+        # Samples no further apart than one cell: every cell the segment
+        # touches is then a neighbour of some sampled cell
+        steps = max(1, int(math.ceil(np.hypot(*(p2 - p1)) / self.cell_size)))
+        t = np.linspace(0, 1, steps + 1)[:, None]
+        cells = np.unique(np.floor((p1 + t * (p2 - p1)) / self.cell_size).astype(int), axis=0)
+
+        found = set()
+        for i, j in cells:
+            for di in (-1, 0, 1):
+                for dj in (-1, 0, 1):
+                    found.update(self.cells.get((i + di, j + dj), ()))
+        return sorted(found)
+
+    def blocked_intervals(self, p1, p2):
+        """Merged (t0, t1) spans of segment p1->p2 that lie inside an exclusion zone"""
+        candidates = self.candidates(p1, p2)
+        if not candidates:
+            return []
+        p1 = np.asarray(p1, dtype=float)
+        p2 = np.asarray(p2, dtype=float)
+
+        ts = [np.array([0.0, 1.0])]
+        ts.extend(segment_crossings(p1, p2, self.polygons[idx]) for idx in candidates)
+        ts = np.unique(np.concatenate(ts))
+
+        mids = (ts[:-1] + ts[1:]) / 2
+        points = p1 + mids[:, None] * (p2 - p1)
+        inside = np.zeros(len(mids), dtype=bool)
+        for idx in candidates:
+            inside |= points_in_polygon(points, self.polygons[idx])
+
+        spans = []
+        for k in np.flatnonzero(inside):
+            if spans and spans[-1][1] == ts[k]:
+                spans[-1][1] = ts[k + 1]
+            else:
+                spans.append([ts[k], ts[k + 1]])
+        return [(float(t0), float(t1)) for t0, t1 in spans]
+
+def clip_path(waypoints, index, spray_mask=None):
+    """Split path legs where they cross exclusion zones.
+
+    Returns the new waypoints and a spray mask with one flag per leg, False for
+    the legs flown across a zone with the spray off. An incoming spray_mask
+    keeps unsprayed legs (such as transit) off.
+    """
+    if spray_mask is None:
+        spray_mask = [True] * max(0, len(waypoints) - 1)
+    if len(waypoints) < 2 or index is None or not index.polygons:
+        return list(waypoints), list(spray_mask)
+
+    new_waypoints = [tuple(waypoints[0])]
+    new_mask = []
+
+    for wp1, wp2, leg_spray in zip(waypoints[:-1], waypoints[1:], spray_mask):
+        p1 = np.asarray(wp1, dtype=float)
+        p2 = np.asarray(wp2, dtype=float)
+
+        pieces = []
+        t = 0.0
+        for t0, t1 in index.blocked_intervals(p1, p2):
+            if t0 > t:
+                pieces.append((t0, True))
+            pieces.append((t1, False))
+            t = t1
+        if t < 1:
+            pieces.append((1.0, True))
+
+        for t_end, spray in pieces:
+            if t_end >= 1:
+                new_waypoints.append(tuple(wp2))
+            else:
+                x, y = p1 + t_end * (p2 - p1)
+                new_waypoints.append((float(x), float(y)))
+            new_mask.append(spray and leg_spray)
+
+    return new_waypoints, new_mask
@@ -0,0 +1,51 @@
+import math
+from .pattern_utils import rotate_point
+from .circle import generate_zigzag as circle_zigzag, generate_spiral as circle_spiral, outline as circle_outline
+from .square import generate_zigzag as square_zigzag, generate_spiral as square_spiral, outline as square_outline
+from .triangle import generate_zigzag as triangle_zigzag, generate_spiral as triangle_spiral, outline as triangle_outline
+from .polygon import generate_zigzag as polygon_zigzag, generate_spiral as polygon_spiral
+
+PATTERN_TYPES = ('zigzag', 'spiral_out', 'spiral_in')
+
+def generate_pattern(shape_type, pattern_type, radius_m, stripe_separation_m, rotation_deg=0, field_polygon=()):
+    """Local waypoints of a pattern, rotated by rotation_deg.
+
+    Built-in shapes rotate with the pattern. Polygon fields are fixed on the
+    ground, so only their stripes turn.
+    """
+    rotation_rad = math.radians(rotation_deg)
+    field_polygon = [rotate_point(x, y, -rotation_rad) for x, y in field_polygon]
+    generators = {
+        'circle': {
+            'zigzag': circle_zigzag,
+            'spiral_out': lambda r, s: circle_spiral(r, s, 'out'),
+            'spiral_in': lambda r, s: circle_spiral(r, s, 'in')
+        },
+        'square': {
+            'zigzag': square_zigzag,
+            'spiral_out': lambda r, s: square_spiral(r, s, 'out'),
+            'spiral_in': lambda r, s: square_spiral(r, s, 'in')
+        },
+        'triangle': {
+            'zigzag': triangle_zigzag,
+            'spiral_out': lambda r, s: triangle_spiral(r, s, 'out'),
+            'spiral_in': lambda r, s: triangle_spiral(r, s, 'in')
+        },
+        'polygon': {
+            'zigzag': lambda r, s: polygon_zigzag(field_polygon, s),
+            'spiral_out': lambda r, s: polygon_spiral(field_polygon, s, 'out'),
+            'spiral_in': lambda r, s: polygon_spiral(field_polygon, s, 'in')
+        }
+    }
+    
+    generator = generators[shape_type][pattern_type]
+    waypoints_local = generator(radius_m, stripe_separation_m)
+    return [rotate_point(x, y, rotation_rad) for x, y in waypoints_local]
+
+def field_outline(shape_type, radius_m, rotation_deg=0, field_polygon=()):
+    """Local outline of the field as generate_pattern places it"""
+    if shape_type == 'polygon':
+        return [tuple(point) for point in field_polygon]
+    outlines = {'circle': circle_outline, 'square': square_outline, 'triangle': triangle_outline}
+    rotation_rad = math.radians(rotation_deg)
+    return [rotate_point(x, y, rotation_rad) for x, y in outlines[shape_type](radius_m)]
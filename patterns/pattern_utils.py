@@ -4,6 +4,30 @@ import numpy as np
 def meters_to_degrees(meters, latitude):
     return meters / (111320 * math.cos(math.radians(latitude)))
 
+def degrees_to_meters(degrees, latitude):
+    return degrees * (111320 * math.cos(math.radians(latitude)))
+
+def project_local(lat, lon, origin_lat, origin_lon):
+    """Equirectangular (x, y) meters east/north of the origin for arrays of lat/lon"""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    x = (lon - origin_lon) * (111320 * math.cos(math.radians(origin_lat)))
+    y = (lat - origin_lat) * 111320
+    return np.stack((x, y), axis=-1)
+
+def unproject_local(x, y, origin_lat, origin_lon):
+    """(lat, lon) of local meters east/north of the origin, the inverse of project_local"""
+    lat = origin_lat + np.asarray(y, dtype=float) / 111320
+    lon = origin_lon + np.asarray(x, dtype=float) / (111320 * math.cos(math.radians(origin_lat)))
+    return lat, lon
+
+def haversine_matrix(lat1, lon1, lat2, lon2):
+    """Great-circle distances in meters between every point of set 1 and set 2"""
+    lat1, lon1 = np.radians(np.asarray(lat1, dtype=float))[:, None], np.radians(np.asarray(lon1, dtype=float))[:, None]
+    lat2, lon2 = np.radians(np.asarray(lat2, dtype=float))[None, :], np.radians(np.asarray(lon2, dtype=float))[None, :]
+    a = np.sin((lat2 - lat1) / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2)**2
+    return 2 * 6371000 * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
 def rotate_point(x, y, angle_rad):
     x_rot = x * math.cos(angle_rad) - y * math.sin(angle_rad)
     y_rot = x * math.sin(angle_rad) + y * math.cos(angle_rad)
@@ -16,36 +40,60 @@ def calculate_distance_meters(p1, p2, latitude):
     dlon = (lon2 - lon1) * (111320 * math.cos(math.radians(latitude)))
     return math.sqrt(dlat**2 + dlon**2)
 
-def add_spray_points(waypoints, interval_m, start_lat, enable_spray=True):
-    """Add spray points between waypoints if enabled"""
+def add_spray_points(waypoints, interval_m, start_lat, enable_spray=True, spray_mask=None):
+    """Add spray points between waypoints if enabled.
+
+    Spray commands are (seq, position, on) tuples. spray_mask holds one flag per
+    leg; legs marked False get no spray points, with the spray switched off at
+    their start and back on where spraying resumes. Consecutive sprayed legs
+    along one straight line, such as a leg follow_terrain split, are spaced
+    as a single leg.
+    """
     if not enable_spray or interval_m <= 0:
         return waypoints, []  # Return original waypoints and empty spray list
     
     if len(waypoints) < 2:
         return waypoints, []
     
+    points = np.asarray([wp[:2] for wp in waypoints], dtype=float)
+    legs = np.diff(points, axis=0) * [111320, 111320 * math.cos(math.radians(start_lat))]
+    lengths = np.hypot(legs[:, 0], legs[:, 1])
+    cross = legs[:-1, 0] * legs[1:, 1] - legs[:-1, 1] * legs[1:, 0]
+    dot = np.einsum('ij,ij->i', legs[:-1], legs[1:])
+    continues = (np.abs(cross) <= 1e-6 * lengths[:-1] * lengths[1:]) & (dot > 0)
+    
     new_waypoints = []
     spray_commands = []
     
-    for i in range(len(waypoints) - 1):
-        wp1 = waypoints[i]
-        wp2 = waypoints[i+1]
-        new_waypoints.append(wp1)
-        
-        distance = calculate_distance_meters(
-            (wp1[0], wp1[1]), 
-            (wp2[0], wp2[1]), 
-            start_lat
-        )
-        num_sprays = int(distance / interval_m)
+    i = 0
+    while i < len(waypoints) - 1:
+        spraying = spray_mask is None or spray_mask[i]
+        was_spraying = spray_mask is None or i == 0 or spray_mask[i-1]
+        end = i + 1
+        while spraying and end < len(waypoints) - 1 and continues[end - 1] and (spray_mask is None or spray_mask[end]):
+            end += 1
         
-        if num_sprays > 0:
-            steps = np.linspace(0, 1, num_sprays + 2)[1:-1]
-            for t in steps:
+        # Spray points evenly along legs i..end-1, each after the waypoint starting its leg
+        offsets = np.concatenate(([0], np.cumsum(lengths[i:end])))
+        num_sprays = int(offsets[-1] / interval_m) if spraying else 0
+        at = offsets[-1] * np.arange(1, num_sprays + 1) / (num_sprays + 1)
+        owner = np.searchsorted(offsets, at, side='right') - 1
+        for k in range(i, end):
+            wp1 = waypoints[k]
+            wp2 = waypoints[k+1]
+            new_waypoints.append(wp1)
+            if k == i and spraying != was_spraying:
+                spray_commands.append((len(new_waypoints) - 1, wp1, spraying))
+            for s in at[owner == k - i]:
+                t = (s - offsets[k - i]) / lengths[k]
+                if t <= 0:
+                    spray_commands.append((len(new_waypoints) - 1, wp1, True))
+                    continue
                 lat = wp1[0] + t * (wp2[0] - wp1[0])
                 lon = wp1[1] + t * (wp2[1] - wp1[1])
-                spray_commands.append((len(new_waypoints), (lat, lon, wp1[2])))
+                spray_commands.append((len(new_waypoints), (lat, lon, wp1[2]), True))
                 new_waypoints.append((lat, lon, wp1[2]))
+        i = end
     
     new_waypoints.append(waypoints[-1])
-    return new_waypoints, spray_commands
\ No newline at end of file
+    return new_waypoints, spray_commands
@@ -0,0 +1,229 @@
+import math
+import numpy as np
+
+def points_in_polygon(points, polygon):
+    """Even-odd ray casting test for an (N, 2) array of points against one polygon"""
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    polygon = np.asarray(polygon, dtype=float)
+    x, y = points[:, 0:1], points[:, 1:2]
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    straddles = (y1 > y) != (y2 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    crossings = straddles & (x < x_cross)
+    return (np.count_nonzero(crossings, axis=1) % 2) == 1
+
+def segment_crossings(p1, p2, polygon):
+    """Parameters t in [0, 1] where segment p1->p2 crosses the polygon's edges"""
+    p1 = np.asarray(p1, dtype=float)
+    d = np.asarray(p2, dtype=float) - p1
+    a = np.asarray(polygon, dtype=float)
+    e = np.roll(a, -1, axis=0) - a
+    diff = a - p1
+    denom = d[0] * e[:, 1] - d[1] * e[:, 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (diff[:, 0] * e[:, 1] - diff[:, 1] * e[:, 0]) / denom
+        u = (diff[:, 0] * d[1] - diff[:, 1] * d[0]) / denom
+    valid = (np.abs(denom) > 1e-12) & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+    return t[valid]
+
+def polygon_area(polygon):
+    """Signed shoelace area, positive for counter-clockwise polygons"""
+    polygon = np.asarray(polygon, dtype=float)
+    x, y = polygon[:, 0], polygon[:, 1]
+    return 0.5 * float(np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y))
+
+def convex_hull(points):
+    """Counter-clockwise convex hull of an (N, 2) array of points (monotone chain)"""
+    points = np.unique(np.asarray(points, dtype=float).reshape(-1, 2), axis=0)
+    if len(points) < 3:
+        return points
+
+    def half(chain_points):
+        chain = []
+        for p in chain_points:
+            while len(chain) >= 2 and ((chain[-1][0] - chain[-2][0]) * (p[1] - chain[-2][1])
+                                       - (chain[-1][1] - chain[-2][1]) * (p[0] - chain[-2][0])) <= 0:
+                chain.pop()
+            chain.append(p)
+        return chain[:-1]
+
+    return np.array(half(points) + half(points[::-1]))
+
+def _line_intersections(points, dirs):
+    """Vertex i is where offset line i-1 meets offset line i"""
+    prev_points, prev_dirs = np.roll(points, 1, axis=0), np.roll(dirs, 1, axis=0)
+    denom = prev_dirs[:, 0] * dirs[:, 1] - prev_dirs[:, 1] * dirs[:, 0]
+    diff = points - prev_points
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = (diff[:, 0] * dirs[:, 1] - diff[:, 1] * dirs[:, 0]) / denom
+    parallel = np.abs(denom) < 1e-12
+    if np.any(parallel & (np.einsum('ij,ij->i', prev_dirs, dirs) < 0)):
+        return None  # Opposite edges met, the polygon has collapsed
+    return np.where(parallel[:, None], points, prev_points + s[:, None] * prev_dirs)
+
+def _crosses(edges, i, j):
+    """True if edges i and j cross at a point inside both of them"""
+    n = len(edges)
+    if abs(i - j) <= 1 or abs(i - j) == n - 1:
+        return False  # Neighbours share a vertex
+    x1, y1, x2, y2 = edges[i]
+    x3, y3, x4, y4 = edges[j]
+    dx, dy, ex, ey = x2 - x1, y2 - y1, x4 - x3, y4 - y3
+    denom = dx * ey - dy * ex
+    if abs(denom) < 1e-12:
+        return False
+    t = ((x3 - x1) * ey - (y3 - y1) * ex) / denom
+    u = ((x3 - x1) * dy - (y3 - y1) * dx) / denom
+    return 0 < t < 1 and 0 < u < 1
+
+def _is_simple(polygon):
+    """True if no two non-adjacent edges of the polygon intersect.
+
+    Shamos-Hoey sweep: edges enter and leave a list kept in vertical order
+    along a line swept left to right, and only edges that become neighbours
+    in it are tested, so there are O(V) crossing tests. The list holds the
+    edges the sweep line currently cuts, and inserting or removing one is
+    linear in that count: O(V log V) for field outlines, which the line
+    cuts a handful of times, and O(V^2) at worst.
+    """
+    polygon = np.asarray(polygon, dtype=float)
+    edges = []
+    events = []
+    for k, (a, b) in enumerate(zip(polygon.tolist(), np.roll(polygon, -1, axis=0).tolist())):
+        (x1, y1), (x2, y2) = sorted((a, b))
+        edges.append((x1, y1, x2, y2))
+        # At equal x, edges enter before others leave, so touching edges meet
+        events.append((x1, 0, y1, k))
+        events.append((x2, 1, y2, k))
+    events.sort()
+
+    def order(k, x):
+        """Height of edge k on the sweep line at x, then its slope to break ties"""
+        x1, y1, x2, y2 = edges[k]
+        if x2 - x1 < 1e-12:
+            return y1, math.inf
+        slope = (y2 - y1) / (x2 - x1)
+        return y1 + slope * (x - x1), slope
+
+    status = []
+    for x, leaving, _, k in events:
+        if leaving:
+            position = status.index(k)
+            del status[position]
+            if 0 < position < len(status) and _crosses(edges, status[position - 1], status[position]):
+                return False
+            continue
+        key = order(k, x)
+        low, high = 0, len(status)
+        while low < high:
+            middle = (low + high) // 2
+            if order(status[middle], x) < key:
+                low = middle + 1
+            else:
+                high = middle
+        status.insert(low, k)
+        if low > 0 and _crosses(edges, status[low - 1], k):
+            return False
+        if low + 1 < len(status) and _crosses(edges, k, status[low + 1]):
+            return False
+    return True
+
+def offset_polygon(polygon, distance):
+    """Inset a simple polygon by distance meters, keeping its orientation.
+
+    Every edge is shifted along its inward normal and neighbouring edges are
+    re-joined at their intersection. Edges that reverse direction have
+    collapsed and are dropped before re-joining. Returns None once the inset
+    vanishes, or when a concave polygon would split into several pieces.
+    """
+    polygon = np.asarray(polygon, dtype=float)
+    orientation = 1.0 if polygon_area(polygon) > 0 else -1.0
+
+    edges = np.roll(polygon, -1, axis=0) - polygon
+    lengths = np.hypot(edges[:, 0], edges[:, 1])
+    keep = lengths > 1e-9
+    dirs = edges[keep] / lengths[keep, None]
+    normals = orientation * np.column_stack((-dirs[:, 1], dirs[:, 0]))
+    points = polygon[keep] + distance * normals
+
+    while len(dirs) >= 3:
+        vertices = _line_intersections(points, dirs)
+        if vertices is None:
+            return None
+        spans = np.roll(vertices, -1, axis=0) - vertices
+        collapsed = np.einsum('ij,ij->i', spans, dirs) <= 1e-9
+        if not collapsed.any():
+            if polygon_area(vertices) * orientation <= 0:
+                return None
+            if _has_reflex_vertex(polygon) and not _is_simple(vertices):
+                return None
+            return vertices
+        points, dirs = points[~collapsed], dirs[~collapsed]
+    return None
+
+def _has_reflex_vertex(polygon):
+    edges = np.roll(polygon, -1, axis=0) - polygon
+    prev_edges = np.roll(edges, 1, axis=0)
+    turns = prev_edges[:, 0] * edges[:, 1] - prev_edges[:, 1] * edges[:, 0]
+    return bool(np.any(turns * polygon_area(polygon) < -1e-9))
+
+def generate_stripes(polygon, stripe_separation_m):
+    """Horizontal stripe segments covering the polygon, one list per scanline"""
+    polygon = np.asarray(polygon, dtype=float)
+    y_min, y_max = polygon[:, 1].min(), polygon[:, 1].max()
+    stripe_count = int((y_max - y_min) / stripe_separation_m)
+    ys = y_min + np.arange(stripe_count + 1) * stripe_separation_m
+    ys = np.minimum(ys, y_max - 1e-6)[:, None]
+
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    straddles = (y1 <= ys) != (y2 <= ys)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        xs = x1 + (ys - y1) * (x2 - x1) / (y2 - y1)
+    xs = np.sort(np.where(straddles, xs, np.nan), axis=1)
+
+    stripes = []
+    for y, row in zip(ys[:, 0], xs):
+        row = row[~np.isnan(row)]
+        stripes.append([((float(row[k]), float(y)), (float(row[k + 1]), float(y)))
+                        for k in range(0, len(row) - 1, 2)])
+    return stripes
+
+def generate_zigzag(polygon, stripe_separation_m):
+    waypoints = [(0, 0)]
+    
+    for i, line in enumerate(generate_stripes(polygon, stripe_separation_m)):
+        if i % 2 == 1:
+            line = [(end, start) for start, end in reversed(line)]
+        for start, end in line:
+            waypoints.append(start)
+            waypoints.append(end)
+    
+    waypoints.append((0, 0))
+    return waypoints
+
+def generate_spiral(polygon, stripe_separation_m, direction="out"):
+    rings = []
+    ring = np.asarray(polygon, dtype=float)
+    inset = 0
+    while ring is not None:
+        rings.append(ring)
+        inset += stripe_separation_m
+        ring = offset_polygon(polygon, inset)
+    
+    if direction == "out":
+        rings.reverse()
+    
+    waypoints = [(0, 0)]
+    for ring in rings:
+        # Enter each ring at the vertex closest to where the last one ended
+        last = np.asarray(waypoints[-1], dtype=float)
+        start = int(np.argmin(np.hypot(*(ring - last).T)))
+        ring = np.roll(ring, -start, axis=0)
+        waypoints.extend((float(x), float(y)) for x, y in ring)
+        waypoints.append((float(ring[0, 0]), float(ring[0, 1])))
+    
+    waypoints.append((0, 0))
+    return waypoints
@@ -1,4 +1,5 @@
 from .pattern_utils import *
+from .polygon import generate_spiral as polygon_spiral
 
 def generate_zigzag(radius_m, stripe_separation_m):
     waypoints = [(0, 0)]
@@ -17,25 +18,9 @@ def generate_zigzag(radius_m, stripe_separation_m):
     waypoints.append((0, 0))
     return waypoints
 
+def outline(radius_m):
+    half_size = radius_m
+    return [(-half_size, -half_size), (-half_size, half_size), (half_size, half_size), (half_size, -half_size)]
+
 def generate_spiral(radius_m, stripe_separation_m, direction="out"):
-    waypoints = [(0, 0)]
-    max_radius = radius_m
-    current_radius = stripe_separation_m if direction == "out" else max_radius
-    
-    while (direction == "out" and current_radius <= max_radius) or \
-          (direction == "in" and current_radius > 0):
-        
-        half_size = current_radius
-        waypoints.append((-half_size, -half_size))
-        waypoints.append((-half_size, half_size))
-        waypoints.append((half_size, half_size))
-        waypoints.append((half_size, -half_size))
-        waypoints.append((-half_size, -half_size))
-        
-        if direction == "out":
-            current_radius += stripe_separation_m
-        else:
-            current_radius -= stripe_separation_m
-    
-    waypoints.append((0, 0))
-    return waypoints
\ No newline at end of file
+    return polygon_spiral(outline(radius_m), stripe_separation_m, direction)
@@ -0,0 +1,29 @@
+from .optimizer import optimize_pattern, score_paths
+from .stripe_router import order_stripes, stripe_path, zigzag_stripes
+from .dubins import dubins_paths, dubins_stripe_path
+from .multi_field import order_fields, plan_fields
+from .fleet import partition_coverage
+from .sortie import split_sorties, trim_mission
+from .speed import classify_legs, schedule_speeds
+from .estimator import estimate_path, estimate_mission
+from .terrain import TerrainModel, follow_terrain
+from .geofence import fence_polygon, rally_points
+from .coverage import CoverageGrid, CoverageTracker, analyze_coverage
+from .progress import MissionProgress
+from .resume import MissionIndex, jump_target, last_spray_position
+
+__all__ = [
+    'optimize_pattern', 'score_paths',
+    'order_stripes', 'stripe_path', 'zigzag_stripes',
+    'dubins_paths', 'dubins_stripe_path',
+    'order_fields', 'plan_fields',
+    'partition_coverage',
+    'split_sorties', 'trim_mission',
+    'classify_legs', 'schedule_speeds',
+    'estimate_path', 'estimate_mission',
+    'TerrainModel', 'follow_terrain',
+    'fence_polygon', 'rally_points',
+    'CoverageGrid', 'CoverageTracker', 'analyze_coverage',
+    'MissionProgress',
+    'MissionIndex', 'jump_target', 'last_spray_position'
+]
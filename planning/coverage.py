@@ -0,0 +1,184 @@
+import numpy as np
+from patterns import project_local
+
+class CoverageGrid:
+    """Occupancy grid over a field, counting the spray passes over every cell.
+
+    Cells are cell_m squares, row 0 at the bottom of the outline's bounding
+    box. A cell belongs to the field, or is covered by a pass, when its
+    center is inside the outline or the pass's swath.
+    """
+
+    def __init__(self, outline, cell_m=0.5):
+        outline = np.asarray(outline, dtype=float)
+        self.cell_m = cell_m
+        self.origin = outline.min(axis=0)
+        width, height = np.ceil((outline.max(axis=0) - self.origin) / cell_m).astype(int)
+        self.shape = (int(height), int(width))
+        self.counts = np.zeros(self.shape, dtype=np.uint16)
+        self.field = self._fill(*self._polygon_spans(outline)) > 0
+
+    def _row_centers(self, y_low, y_high):
+        """First and last row whose center lies in [y_low, y_high], per shape"""
+        first = np.ceil((y_low - self.origin[1]) / self.cell_m - 0.5).astype(int)
+        last = np.floor((y_high - self.origin[1]) / self.cell_m - 0.5).astype(int)
+        return np.maximum(first, 0), np.minimum(last, self.shape[0] - 1)
+
+    def _crossings(self, x1, y1, x2, y2, y):
+        """Sorted x where edges (..., E) cross the row heights y (..., 1), NaN where they don't"""
+        straddles = (y1 <= y) != (y2 <= y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            xs = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        return np.sort(np.where(straddles, xs, np.nan), axis=-1)
+
+    def _polygon_spans(self, polygon):
+        """Rows and x intervals inside a polygon, even-odd rule"""
+        first, last = self._row_centers(polygon[:, 1].min(), polygon[:, 1].max())
+        rows = np.arange(first, last + 1)
+        y = (self.origin[1] + (rows + 0.5) * self.cell_m)[:, None]
+        x1, y1 = polygon[:, 0], polygon[:, 1]
+        xs = self._crossings(x1, y1, np.roll(x1, -1), np.roll(y1, -1), y)
+        pairs = len(polygon) // 2
+        rows = np.repeat(rows, pairs)
+        x_in, x_out = xs[:, 0:2 * pairs:2].ravel(), xs[:, 1:2 * pairs:2].ravel()
+        valid = ~np.isnan(x_in) & ~np.isnan(x_out)
+        return rows[valid], x_in[valid], x_out[valid]
+
+    def swath_spans(self, p0, p1, half_width):
+        """Rows and x intervals inside the rectangles around legs p0 -> p1, all legs at once"""
+        p0, p1 = np.atleast_2d(p0).astype(float), np.atleast_2d(p1).astype(float)
+        direction = p1 - p0
+        length = np.hypot(direction[:, 0], direction[:, 1])
+        keep = length > 1e-9
+        p0, p1 = p0[keep], p1[keep]
+        normal = np.column_stack((-direction[keep, 1], direction[keep, 0])) / length[keep, None] * half_width
+        corners = np.stack((p0 + normal, p1 + normal, p1 - normal, p0 - normal), axis=1)
+
+        first, last = self._row_centers(corners[..., 1].min(axis=1), corners[..., 1].max(axis=1))
+        counts = np.maximum(last - first + 1, 0)
+        leg = np.repeat(np.arange(len(corners)), counts)
+        rows = np.repeat(first, counts) + np.arange(len(leg)) - np.repeat(np.cumsum(counts) - counts, counts)
+        y = (self.origin[1] + (rows + 0.5) * self.cell_m)[:, None]
+        x1, y1 = corners[leg, :, 0], corners[leg, :, 1]
+        xs = self._crossings(x1, y1, np.roll(x1, -1, axis=1), np.roll(y1, -1, axis=1), y)
+        valid = ~np.isnan(xs[:, 1])
+        return rows[valid], xs[valid, 0], xs[valid, 1]
+
+    def _columns(self, x_in, x_out):
+        first = np.ceil((x_in - self.origin[0]) / self.cell_m - 0.5).astype(int)
+        last = np.floor((x_out - self.origin[0]) / self.cell_m - 0.5).astype(int)
+        return np.maximum(first, 0), np.minimum(last + 1, self.shape[1])
+
+    def _fill(self, rows, x_in, x_out):
+        """Per-cell count of the spans, through a difference array"""
+        start, end = self._columns(x_in, x_out)
+        valid = start < end
+        rows, start, end = rows[valid], start[valid], end[valid]
+        width = self.shape[1] + 1
+        diff = np.bincount(rows * width + start, minlength=self.shape[0] * width)
+        diff -= np.bincount(rows * width + end, minlength=self.shape[0] * width)
+        return np.cumsum(diff.reshape(self.shape[0], width), axis=1)[:, :-1]
+
+    def stamp_legs(self, p0, p1, half_width):
+        """Add one pass for every leg p0 -> p1"""
+        self.counts += self._fill(*self.swath_spans(p0, p1, half_width)).astype(np.uint16)
+
+    def stamp(self, p0, p1, half_width):
+        """Add one pass for a single leg, touching only its own cells.
+
+        Returns the flat indices of those cells. A rectangle covers each row
+        in one interval, so no cell repeats.
+        """
+        rows, x_in, x_out = self.swath_spans(p0, p1, half_width)
+        start, end = self._columns(x_in, x_out)
+        lengths = np.maximum(end - start, 0)
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        cells = np.repeat(rows * self.shape[1] + start, lengths) + offsets
+        self.counts.flat[cells] += 1
+        return cells
+
+def analyze_coverage(waypoints, spray_mask, outline, spray_width_m, cell_m=0.5, gap_block_m=10, min_gap_m2=1.0):
+    """Coverage quality of a local path over a field.
+
+    Sprayed legs are buffered by half of spray_width_m and stamped onto a
+    CoverageGrid. Returns the coverage and overlap (cells sprayed more than
+    once) as percentages of the field area, and the gaps as gap_block_m
+    squares holding at least min_gap_m2 of unsprayed field, largest first.
+    """
+    points = np.asarray(waypoints, dtype=float)
+    sprayed = np.ones(len(points) - 1, dtype=bool) if spray_mask is None else np.asarray(spray_mask, dtype=bool)
+    grid = CoverageGrid(outline, cell_m)
+    grid.stamp_legs(points[:-1][sprayed], points[1:][sprayed], spray_width_m / 2)
+
+    field_cells = max(int(np.count_nonzero(grid.field)), 1)
+    covered = grid.field & (grid.counts > 0)
+    overlap = grid.field & (grid.counts > 1)
+
+    # Unsprayed field area per block
+    block = max(1, int(round(gap_block_m / cell_m)))
+    height, width = grid.shape
+    padded = np.zeros((-(-height // block) * block, -(-width // block) * block))
+    padded[:height, :width] = grid.field & ~covered
+    gap_area = padded.reshape(padded.shape[0] // block, block, -1, block).sum(axis=(1, 3)) * cell_m ** 2
+    block_rows, block_cols = np.nonzero(gap_area >= min_gap_m2)
+    order = np.argsort(-gap_area[block_rows, block_cols], kind='stable')
+    gaps = [
+        {
+            'x': float(grid.origin[0] + (col + 0.5) * block * cell_m),
+            'y': float(grid.origin[1] + (row + 0.5) * block * cell_m),
+            'area_m2': float(gap_area[row, col])
+        }
+        for row, col in zip(block_rows[order].tolist(), block_cols[order].tolist())
+    ]
+
+    return {
+        'field_area_m2': field_cells * cell_m ** 2,
+        'coverage_pct': 100 * np.count_nonzero(covered) / field_cells,
+        'overlap_pct': 100 * np.count_nonzero(overlap) / field_cells,
+        'gaps': gaps,
+        'grid': grid
+    }
+
+class CoverageTracker:
+    """Live sprayed area from GLOBAL_POSITION_INT and SERVO_OUTPUT_RAW.
+
+    Positions map into the planning frame around the start position. While
+    the servo_channel output is nearer servo_pwm than servo_pwm_off, each new
+    position stamps only the leg since the previous one. The count of
+    covered field cells is kept up to date, so percent_covered is O(1).
+    """
+
+    def __init__(self, outline, params, start_lat, start_lon):
+        self.grid = CoverageGrid(outline, params.coverage_cell_m)
+        self.half_width = params.spray_width_m / 2
+        self.servo_field = f'servo{params.servo_channel}_raw'
+        self.threshold = (params.servo_pwm + params.servo_pwm_off) / 2
+        self.spray_high = params.servo_pwm > params.servo_pwm_off
+        self.start_lat = start_lat
+        self.start_lon = start_lon
+        self.field_cells = max(int(np.count_nonzero(self.grid.field)), 1)
+        self.covered_cells = 0
+        self.spraying = False
+        self.position = None
+
+    def handle(self, msg):
+        """Feed any message; GLOBAL_POSITION_INT and SERVO_OUTPUT_RAW are used"""
+        msg_type = msg.get_type()
+        if msg_type == 'GLOBAL_POSITION_INT':
+            self.update_position(msg.lat / 1e7, msg.lon / 1e7)
+        elif msg_type == 'SERVO_OUTPUT_RAW':
+            pwm = getattr(msg, self.servo_field, None)
+            if pwm is not None:
+                self.spraying = (pwm > self.threshold) == self.spray_high
+
+    def update_position(self, lat, lon):
+        position = project_local(lat, lon, self.start_lat, self.start_lon)
+        if self.spraying and self.position is not None:
+            cells = self.grid.stamp(self.position, position, self.half_width)
+            fresh = (self.grid.counts.flat[cells] == 1) & self.grid.field.flat[cells]
+            self.covered_cells += int(np.count_nonzero(fresh))
+        self.position = position
+
+    @property
+    def percent_covered(self):
+        return 100 * self.covered_cells / self.field_cells
@@ -0,0 +1,140 @@
+import numpy as np
+from .stripe_router import stripe_path
+
+# Turn direction of each segment: 1 left, -1 right, 0 straight
+WORDS = np.array([
+    [1, 0, 1],    # LSL
+    [-1, 0, -1],  # RSR
+    [1, 0, -1],   # LSR
+    [-1, 0, 1],   # RSL
+    [-1, 1, -1],  # RLR
+    [1, -1, 1],   # LRL
+])
+
+def _mod2pi(angle):
+    return np.mod(angle, 2 * np.pi)
+
+def dubins_paths(p0, heading0, p1, heading1, radius):
+    """Shortest Dubins path for every pair of poses at once.
+
+    p0 and p1 are (N, 2) points, headings are (N,) angles in radians.
+    Returns the word index into WORDS and the (N, 3) segment lengths in
+    meters. Short hops between close stripes come out as RLR/LRL bulbs.
+    """
+    delta = p1 - p0
+    d = np.hypot(delta[:, 0], delta[:, 1]) / radius
+    phi = np.arctan2(delta[:, 1], delta[:, 0])
+    alpha = _mod2pi(heading0 - phi)
+    beta = _mod2pi(heading1 - phi)
+    sa, sb, ca, cb = np.sin(alpha), np.sin(beta), np.cos(alpha), np.cos(beta)
+    c_ab = np.cos(alpha - beta)
+
+    lengths = np.full((len(d), 6, 3), np.inf)
+    with np.errstate(invalid='ignore'):
+        # LSL
+        p_sq = 2 + d * d - 2 * c_ab + 2 * d * (sa - sb)
+        tmp = np.arctan2(cb - ca, d + sa - sb)
+        ok = p_sq >= 0
+        lengths[ok, 0] = np.stack((_mod2pi(tmp - alpha), np.sqrt(p_sq), _mod2pi(beta - tmp)), axis=1)[ok]
+        # RSR
+        p_sq = 2 + d * d - 2 * c_ab + 2 * d * (sb - sa)
+        tmp = np.arctan2(ca - cb, d - sa + sb)
+        ok = p_sq >= 0
+        lengths[ok, 1] = np.stack((_mod2pi(alpha - tmp), np.sqrt(p_sq), _mod2pi(tmp - beta)), axis=1)[ok]
+        # LSR
+        p_sq = -2 + d * d + 2 * c_ab + 2 * d * (sa + sb)
+        p = np.sqrt(p_sq)
+        tmp = np.arctan2(-ca - cb, d + sa + sb) - np.arctan2(-2.0, p)
+        ok = p_sq >= 0
+        lengths[ok, 2] = np.stack((_mod2pi(tmp - alpha), p, _mod2pi(tmp - beta)), axis=1)[ok]
+        # RSL
+        p_sq = -2 + d * d + 2 * c_ab - 2 * d * (sa + sb)
+        p = np.sqrt(p_sq)
+        tmp = np.arctan2(ca + cb, d - sa - sb) - np.arctan2(2.0, p)
+        ok = p_sq >= 0
+        lengths[ok, 3] = np.stack((_mod2pi(alpha - tmp), p, _mod2pi(beta - tmp)), axis=1)[ok]
+        # RLR
+        cos_p = (6 - d * d + 2 * c_ab + 2 * d * (sa - sb)) / 8
+        tmp = np.arctan2(ca - cb, d - sa + sb)
+        p = _mod2pi(2 * np.pi - np.arccos(cos_p))
+        t = _mod2pi(alpha - tmp + _mod2pi(p / 2))
+        ok = np.abs(cos_p) <= 1
+        lengths[ok, 4] = np.stack((t, p, _mod2pi(alpha - beta - t + p)), axis=1)[ok]
+        # LRL
+        cos_p = (6 - d * d + 2 * c_ab + 2 * d * (sb - sa)) / 8
+        tmp = np.arctan2(ca - cb, d + sa - sb)
+        p = _mod2pi(2 * np.pi - np.arccos(cos_p))
+        t = _mod2pi(-alpha - tmp + p / 2)
+        ok = np.abs(cos_p) <= 1
+        lengths[ok, 5] = np.stack((t, p, _mod2pi(beta - alpha - t + p)), axis=1)[ok]
+
+    word = np.argmin(lengths.sum(axis=2), axis=1)
+    return word, lengths[np.arange(len(d)), word] * radius
+
+def _advance(x, y, heading, turn, distance, radius):
+    """Pose after flying distance along a segment of the given turn direction"""
+    u = distance / radius
+    turning = turn != 0
+    k = np.where(turning, turn, 1)
+    new_heading = heading + turn * u
+    new_x = np.where(turning, x + k * radius * (np.sin(heading + k * u) - np.sin(heading)), x + distance * np.cos(heading))
+    new_y = np.where(turning, y + k * radius * (np.cos(heading) - np.cos(heading + k * u)), y + distance * np.sin(heading))
+    return new_x, new_y, new_heading
+
+def sample_dubins(p0, heading0, word, lengths, radius, step_m):
+    """Points every step_m along each path, endpoints excluded, flattened.
+
+    Returns the points and the index of the path each point belongs to.
+    """
+    turns = WORDS[word]
+    totals = lengths.sum(axis=1)
+    counts = np.maximum(0, np.ceil(totals / step_m).astype(int) - 1)
+    path = np.repeat(np.arange(len(word)), counts)
+    first = np.repeat(np.cumsum(counts) - counts, counts)
+    distance = (np.arange(len(path)) - first + 1) * (totals[path] / (counts[path] + 1))
+
+    # Start pose of each of the three segments
+    x, y, heading = p0[:, 0], p0[:, 1], heading0
+    starts = []
+    for segment in range(3):
+        starts.append((x, y, heading))
+        x, y, heading = _advance(x, y, heading, turns[:, segment], lengths[:, segment], radius)
+
+    bounds = np.cumsum(lengths, axis=1)[path]
+    segment = (distance[:, None] > bounds[:, :2]).sum(axis=1)
+    offset = distance - np.where(segment > 0, bounds[np.arange(len(path)), np.maximum(segment - 1, 0)], 0)
+    sx = np.choose(segment, [s[0][path] for s in starts])
+    sy = np.choose(segment, [s[1][path] for s in starts])
+    sh = np.choose(segment, [s[2][path] for s in starts])
+    px, py, _ = _advance(sx, sy, sh, turns[path, segment], offset, radius)
+    return np.column_stack((px, py)), path
+
+def dubins_stripe_path(segments, start, end, turn_radius_m, step_m):
+    """Like stripe_path, with stripe-to-stripe links flown as sampled Dubins paths.
+
+    All turns are solved and sampled in one vectorized pass. The legs from
+    start and back to end stay straight. Turn points are flown with the
+    spray off.
+    """
+    waypoints, spray_mask = stripe_path(segments, start, end)
+    if len(segments) < 2 or turn_radius_m <= 0:
+        return waypoints, spray_mask
+
+    stripes = np.asarray(segments, dtype=float)
+    directions = stripes[:, 1] - stripes[:, 0]
+    headings = np.arctan2(directions[:, 1], directions[:, 0])
+    p0, p1 = stripes[:-1, 1], stripes[1:, 0]
+    word, lengths = dubins_paths(p0, headings[:-1], p1, headings[1:], turn_radius_m)
+    points, path = sample_dubins(p0, headings[:-1], word, lengths, turn_radius_m, step_m)
+    turn_points = np.split(points, np.cumsum(np.bincount(path, minlength=len(word)))[:-1])
+
+    new_waypoints = list(waypoints[:3])
+    new_mask = list(spray_mask[:2])
+    for k, turn in enumerate(turn_points):
+        # Exit of stripe k, turn points, entry and exit of stripe k+1
+        new_waypoints.extend(map(tuple, turn.tolist()))
+        new_waypoints.extend(waypoints[3 + 2 * k:5 + 2 * k])
+        new_mask.extend([False] * (len(turn) + 1) + [True])
+    new_waypoints.extend(waypoints[2 * len(segments) + 1:])
+    new_mask.extend(spray_mask[2 * len(segments):])
+    return new_waypoints, new_mask
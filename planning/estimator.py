@@ -0,0 +1,104 @@
+import numpy as np
+from pymavlink import mavutil
+from patterns import project_local
+
+HOVER_COMMANDS = (
+    mavutil.mavlink.MAV_CMD_NAV_VTOL_TAKEOFF,
+    mavutil.mavlink.MAV_CMD_NAV_VTOL_LAND,
+)
+
+def estimate_path(points, params, hover=None, speed=None):
+    """Flight time, energy and ETAs along local waypoints.
+
+    points is an (..., N, 2) or (..., N, 3) array of x, y and optional
+    altitude in meters, so a whole batch of paths is estimated at once.
+    speed optionally gives the (..., N-1) segment ground speeds in place of
+    cruise_speed_ms. Each segment takes the longer of its cruise and
+    climb/sink time. A turn adds its heading change over turn_rate_dps.
+    hover marks the (..., N-1) segments flown as a multirotor, at hover
+    speed and power; each switch between hover and forward flight adds
+    transition_time_s at hover power.
+    Returns total time_s, energy_wh, length_m and per-waypoint eta_s.
+    """
+    points = np.asarray(points, dtype=float)
+    segments = np.diff(points, axis=-2)
+    horizontal = np.hypot(segments[..., 0], segments[..., 1])
+    climb = segments[..., 2] if points.shape[-1] > 2 else np.zeros_like(horizontal)
+    hover = np.zeros(horizontal.shape, dtype=bool) if hover is None else np.asarray(hover, dtype=bool)
+
+    speed = np.where(hover, params.hover_speed_ms, params.cruise_speed_ms if speed is None else speed)
+    climb_time = np.where(climb > 0, climb / params.climb_rate_ms, -climb / params.sink_rate_ms)
+    segment_time = np.maximum(horizontal / speed, climb_time)
+
+    # Heading change at each interior waypoint, charged to the segment after it. Zero-length
+    # segments (DO items repeat the position of their NAV item) are skipped, so the turn
+    # is measured from the last segment that moved
+    headings = np.arctan2(segments[..., 1], segments[..., 0])
+    moving = horizontal > 1e-6
+    last_moving = np.maximum.accumulate(np.where(moving, np.arange(moving.shape[-1]), -1), axis=-1)
+    previous = last_moving[..., :-1]
+    previous_heading = np.take_along_axis(headings, np.maximum(previous, 0), axis=-1)
+    turn = np.abs((headings[..., 1:] - previous_heading + np.pi) % (2 * np.pi) - np.pi)
+    turning = moving[..., 1:] & (previous >= 0) & ~hover[..., 1:]
+    segment_time[..., 1:] += np.where(turning, turn, 0) / np.radians(params.turn_rate_dps)
+
+    transitions = np.count_nonzero(np.diff(hover, axis=-1), axis=-1)
+    transition_time = transitions * params.transition_time_s
+
+    power = np.where(hover, params.hover_power_w, params.cruise_power_w)
+    energy_j = (segment_time * power).sum(axis=-1) + transition_time * params.hover_power_w
+    eta = np.concatenate((np.zeros(segment_time.shape[:-1] + (1,)), np.cumsum(segment_time, axis=-1)), axis=-1)
+
+    return {
+        'time_s': eta[..., -1] + transition_time,
+        'energy_wh': energy_j / 3600,
+        'length_m': horizontal.sum(axis=-1),
+        'eta_s': eta
+    }
+
+def mission_points(mission_items, home_lat, home_lon):
+    """Local (x, y, z) of every item and a NAV mask.
+
+    DO items take the position of the NAV item before them, and
+    RETURN_TO_LAUNCH flies back to home at the altitude it left from.
+    """
+    count = len(mission_items)
+    commands = np.array([item['command'] for item in mission_items])
+    is_nav = commands < mavutil.mavlink.MAV_CMD_NAV_LAST
+    lat = np.array([item['x'] for item in mission_items], dtype=float)
+    lon = np.array([item['y'] for item in mission_items], dtype=float)
+    z = np.array([item['z'] for item in mission_items], dtype=float)
+
+    rtl = commands == mavutil.mavlink.MAV_CMD_NAV_RETURN_TO_LAUNCH
+    lat[rtl], lon[rtl] = home_lat, home_lon
+    positioned = is_nav & ~rtl
+
+    last_nav = np.maximum.accumulate(np.where(is_nav, np.arange(count), 0))
+    last_positioned = np.maximum.accumulate(np.where(positioned, np.arange(count), 0))
+    xy = project_local(lat[last_nav], lon[last_nav], home_lat, home_lon)
+    return np.column_stack((xy, z[last_positioned])), is_nav
+
+def spray_state(mission_items, params):
+    """Whether the spray is on after each item"""
+    states = np.full(len(mission_items), -1)
+    for i, item in enumerate(mission_items):
+        if item['command'] == mavutil.mavlink.MAV_CMD_DO_SET_SERVO and item['param1'] == params.servo_channel:
+            states[i] = 1 if item['param2'] == params.servo_pwm else 0
+    last_set = np.maximum.accumulate(np.where(states >= 0, np.arange(len(states)), -1))
+    return np.where(last_set >= 0, states[np.maximum(last_set, 0)], 0) == 1
+
+def mission_speeds(mission_items, params):
+    """Ground speed in force after each item, following DO_CHANGE_SPEED items"""
+    speeds = np.full(len(mission_items), np.nan)
+    for i, item in enumerate(mission_items):
+        if item['command'] == mavutil.mavlink.MAV_CMD_DO_CHANGE_SPEED and item['param2'] > 0:
+            speeds[i] = item['param2']
+    last_set = np.maximum.accumulate(np.where(np.isnan(speeds), -1, np.arange(len(speeds))))
+    return np.where(last_set >= 0, speeds[np.maximum(last_set, 0)], params.cruise_speed_ms)
+
+def estimate_mission(mission_items, params, home_lat, home_lon):
+    """estimate_path over built mission items, with an ETA for every item"""
+    points, is_nav = mission_points(mission_items, home_lat, home_lon)
+    commands = np.array([item['command'] for item in mission_items])
+    hover = np.isin(commands[1:], HOVER_COMMANDS)
+    return estimate_path(points, params, hover, mission_speeds(mission_items, params)[:-1])
@@ -0,0 +1,108 @@
+import math
+import numpy as np
+from patterns import generate_pattern
+from .stripe_router import zigzag_stripes, order_stripes, stripe_path
+
+def _group_costs(stripes, params, home):
+    """Flight time of every contiguous stripe group starting at each stripe, as a function.
+
+    Stripe lengths and the connectors between neighbours are prefix-summed,
+    so the time of stripes a..b-1 (transit from and back to home included)
+    costs O(1) per group and vectorizes over b.
+    """
+    lengths = np.hypot(*(stripes[:, 1] - stripes[:, 0]).T)
+    middles = stripes.mean(axis=1)
+    links = np.append(np.hypot(*np.diff(middles, axis=0).T), 0)
+    prefix = np.concatenate(([0], np.cumsum(lengths + links)))
+    home_gap = np.hypot(*(stripes - home).transpose(2, 0, 1)).min(axis=1)
+
+    def cost(a, b):
+        b = np.asarray(b)
+        work = prefix[b] - prefix[a] - links[b - 1]
+        transit = home_gap[a] + home_gap[b - 1]
+        # Each connector is two quarter turns
+        turning = (b - a - 1) * math.pi / math.radians(params.turn_rate_dps)
+        return (work + transit) / params.cruise_speed_ms + turning
+
+    return cost
+
+def _split_by_time(count, vehicles, cost):
+    """Contiguous groups that minimize the longest flight time, by bisecting on that time"""
+    def greedy(limit):
+        bounds = [0]
+        while bounds[-1] < count:
+            a = bounds[-1]
+            fits = np.flatnonzero(cost(a, np.arange(a + 1, count + 1)) <= limit)
+            if len(fits) == 0:
+                return None
+            bounds.append(a + 1 + int(fits[-1]))
+        return bounds if len(bounds) - 1 <= vehicles else None
+
+    low = float(np.max(cost(np.arange(count), np.arange(1, count + 1))))
+    high = float(cost(0, count))
+    best = greedy(high)
+    for _ in range(50):
+        if high - low < 1e-3 * high:
+            break
+        middle = (low + high) / 2
+        bounds = greedy(middle)
+        if bounds is None:
+            low = middle
+        else:
+            high, best = middle, bounds
+    return list(zip(best[:-1], best[1:]))
+
+def partition_coverage(params, vehicles, balance='time', home=(0, 0)):
+    """Split a field's zigzag stripes into up to `vehicles` non-overlapping missions.
+
+    Stripes are kept in sweep order and cut into contiguous blocks, so every
+    vehicle covers its own strip of the field. balance='count' gives each
+    block the same number of stripes. balance='time' minimizes the longest
+    estimated flight time, including transit from and back to home.
+    Returns one dict per mission with local waypoints, spray mask and
+    estimated time.
+    """
+    waypoints = generate_pattern(
+        params.shape_type,
+        'zigzag',
+        params.radius_m,
+        params.stripe_separation_m,
+        params.rotation_deg,
+        params.field_polygon
+    )
+    stripes = zigzag_stripes(waypoints)
+    count = len(stripes)
+    vehicles = max(1, min(vehicles, count))
+    cost = _group_costs(stripes, params, np.asarray(home, dtype=float))
+
+    if balance == 'count':
+        edges = np.linspace(0, count, vehicles + 1).round().astype(int)
+        groups = list(zip(edges[:-1], edges[1:]))
+    else:
+        groups = _split_by_time(count, vehicles, cost)
+
+    end = home if params.return_to_start else None
+    missions = []
+    for a, b in groups:
+        if params.optimize_stripe_order:
+            segments = order_stripes(stripes[a:b], home, end, params.turn_radius_m, time_limit_s=0.2)
+        else:
+            # Sweep from whichever edge of the block is closer to home
+            block = stripes[a:b]
+            if np.hypot(*(block[-1] - home).T).min() < np.hypot(*(block[0] - home).T).min():
+                block = block[::-1]
+            segments = []
+            position = np.asarray(home, dtype=float)
+            for stripe in block:
+                if np.hypot(*(stripe[1] - position)) < np.hypot(*(stripe[0] - position)):
+                    stripe = stripe[::-1]
+                segments.append((tuple(stripe[0]), tuple(stripe[1])))
+                position = stripe[1]
+        path, spray_mask = stripe_path(segments, home, end)
+        missions.append({
+            'waypoints': path,
+            'spray_mask': spray_mask,
+            'stripes': int(b - a),
+            'time_s': float(cost(a, b))
+        })
+    return missions
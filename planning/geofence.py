@@ -0,0 +1,37 @@
+import numpy as np
+from patterns import field_outline, points_in_polygon, convex_hull, offset_polygon
+
+def fence_polygon(params, waypoints=(), home=(0, 0)):
+    """Inclusion fence fence_margin_m outside the field, in local meters.
+
+    The outline of the configured shape is used when its outset holds home
+    and every waypoint. Otherwise (multi-field missions, transit from a home
+    outside the field, concave outsets that would self-intersect) it falls
+    back to the convex hull of the outline, waypoints and home. Returns None
+    when everything lies on one line.
+    """
+    outline = np.empty((0, 2))
+    if not params.fields and (params.shape_type != 'polygon' or len(params.field_polygon) >= 3):
+        outline = np.asarray(field_outline(
+            params.shape_type, params.radius_m, params.rotation_deg, params.field_polygon), dtype=float)
+    flown = np.vstack((np.asarray(waypoints, dtype=float).reshape(-1, 2), np.asarray(home, dtype=float)))
+
+    if len(outline) >= 3:
+        fence = offset_polygon(outline, -params.fence_margin_m)
+        if fence is not None and points_in_polygon(flown, fence).all():
+            return fence
+    hull = convex_hull(np.vstack((outline, flown)))
+    return offset_polygon(hull, -params.fence_margin_m) if len(hull) >= 3 else None
+
+def rally_points(fence, count, inset_m, home=(0, 0)):
+    """Home plus count points evenly spaced around the fence, inset_m inside it"""
+    points = [tuple(home)]
+    if fence is None or count <= 0:
+        return points
+    inset = offset_polygon(fence, inset_m)
+    ring = np.asarray(fence if inset is None else inset)
+    ring = np.vstack((ring, ring[:1]))
+    distance = np.concatenate(([0], np.cumsum(np.hypot(*np.diff(ring, axis=0).T))))
+    stops = np.linspace(0, distance[-1], count, endpoint=False)
+    around = np.column_stack((np.interp(stops, distance, ring[:, 0]), np.interp(stops, distance, ring[:, 1])))
+    return points + [tuple(point) for point in around.tolist()]
@@ -0,0 +1,109 @@
+import time
+import numpy as np
+from patterns import generate_pattern, project_local, unproject_local, haversine_matrix
+
+FIELD_DEFAULTS = ('shape_type', 'pattern_type', 'radius_m', 'stripe_separation_m', 'rotation_deg', 'field_polygon')
+
+def field_settings(field, params):
+    """A field definition with anything it leaves out taken from params"""
+    settings = {key: getattr(params, key) for key in FIELD_DEFAULTS}
+    settings.update(field)
+    return settings
+
+def _field_path(settings):
+    # Drop the return to the field center, fields are joined by transit legs instead
+    return generate_pattern(
+        settings['shape_type'],
+        settings['pattern_type'],
+        settings['radius_m'],
+        settings['stripe_separation_m'],
+        settings['rotation_deg'],
+        settings['field_polygon']
+    )[1:-1]
+
+def order_fields(transit, start_cost, end_cost, time_limit_s=0.5):
+    """Visit order and direction of fields, nearest-neighbour seeded and improved by 2-opt.
+
+    transit[i, fi, j, fj] is the distance from field i flown in direction fi
+    to field j flown in direction fj. start_cost and end_cost are the legs
+    from and to the home point. Returns (field, direction) pairs.
+    """
+    count = len(start_cost)
+    deadline = time.perf_counter() + time_limit_s
+
+    # Home is node `count`, the same at both ends of the tour
+    cost = np.zeros((count + 1, 2, count + 1, 2))
+    cost[:count, :, :count, :] = transit
+    cost[count, :, :count, :] = start_cost[None]
+    cost[:count, :, count, :] = end_cost[:, :, None]
+
+    order, flips = [count], [0]
+    unvisited = np.ones(count, dtype=bool)
+    for _ in range(count):
+        legs = np.where(unvisited[:, None], cost[order[-1], flips[-1], :count], np.inf)
+        field, flip = np.unravel_index(int(np.argmin(legs)), legs.shape)
+        order.append(int(field))
+        flips.append(int(flip))
+        unvisited[field] = False
+    order.append(count)
+    flips.append(0)
+
+    order, flips = np.array(order), np.array(flips)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(count):
+            # Reverse fields i+1..j for every j at once
+            j = np.arange(i + 1, count + 1)
+            a, fa, b, fb = order[i], flips[i], order[i + 1], flips[i + 1]
+            c, fc, d, fd = order[j], flips[j], order[j + 1], flips[j + 1]
+            delta = (cost[a, fa, c, 1 - fc] + cost[b, 1 - fb, d, fd]
+                     - cost[a, fa, b, fb] - cost[c, fc, d, fd])
+            k = int(np.argmin(delta))
+            if delta[k] < -1e-6:
+                lo, hi = i + 1, j[k] + 1
+                order[lo:hi] = order[lo:hi][::-1]
+                flips[lo:hi] = 1 - flips[lo:hi][::-1]
+                improved = True
+
+    return [(int(field), int(flip)) for field, flip in zip(order[1:-1], flips[1:-1])]
+
+def plan_fields(fields, params, home_lat, home_lon, return_home=True):
+    """One path over several fields, in local meters around the home point.
+
+    Each field is a dict with its center 'lat' and 'lon', plus any pattern
+    settings that differ from params. Fields may be flown backwards so the
+    sortie enters each one at the end nearest the previous field. Returns the
+    waypoints and a spray flag for every leg, off on transit legs.
+    """
+    paths = []
+    for field in fields:
+        settings = field_settings(field, params)
+        offset = project_local(settings['lat'], settings['lon'], home_lat, home_lon)
+        paths.append(np.asarray(_field_path(settings), dtype=float) + offset)
+
+    # Entry and exit of every field in both directions, as lat/lon
+    ends = np.array([[path[0], path[-1]] for path in paths])
+    ends_lat, ends_lon = unproject_local(ends[..., 0], ends[..., 1], home_lat, home_lon)
+    entry_lat, entry_lon = ends_lat, ends_lon
+    exit_lat, exit_lon = ends_lat[:, ::-1], ends_lon[:, ::-1]
+
+    count = len(paths)
+    transit = haversine_matrix(exit_lat.ravel(), exit_lon.ravel(), entry_lat.ravel(), entry_lon.ravel())
+    transit = transit.reshape(count, 2, count, 2)
+    start_cost = haversine_matrix([home_lat], [home_lon], entry_lat.ravel(), entry_lon.ravel()).reshape(count, 2)
+    end_cost = haversine_matrix(exit_lat.ravel(), exit_lon.ravel(), [home_lat], [home_lon]).reshape(count, 2)
+    if not return_home:
+        end_cost = np.zeros_like(end_cost)
+
+    waypoints = [(0, 0)]
+    spray_mask = []
+    for field, flip in order_fields(transit, start_cost, end_cost):
+        path = paths[field][::-1] if flip else paths[field]
+        waypoints.extend(map(tuple, path.tolist()))
+        spray_mask.append(False)
+        spray_mask.extend([True] * (len(path) - 1))
+    if return_home:
+        waypoints.append((0, 0))
+        spray_mask.append(False)
+    return waypoints, spray_mask
@@ -0,0 +1,77 @@
+import math
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from patterns import PATTERN_TYPES, generate_pattern, field_outline
+from .estimator import estimate_path
+from .coverage import analyze_coverage
+
+COVERAGE_CELLS_PER_SWATH = 10  # Resolution of the coverage grid used to compare candidates
+COVERAGE_TOLERANCE_PCT = 1.0  # Coverage short of the best candidate that still competes on time
+
+def score_paths(paths, params, turn_threshold_deg=50):
+    """Path length, sharp turn count and estimated flight time for a (B, N, 2) batch of paths"""
+    paths = np.asarray(paths, dtype=float)
+    segments = np.diff(paths, axis=1)
+    lengths = np.hypot(segments[..., 0], segments[..., 1])
+    headings = np.arctan2(segments[..., 1], segments[..., 0])
+    heading_change = np.abs((np.diff(headings, axis=1) + np.pi) % (2 * np.pi) - np.pi)
+    moving = (lengths[:, :-1] > 1e-6) & (lengths[:, 1:] > 1e-6)
+    
+    turns = np.count_nonzero(moving & (heading_change > math.radians(turn_threshold_deg)), axis=1)
+    estimate = estimate_path(paths, params)
+    return estimate['length_m'], turns, estimate['time_s']
+
+def path_coverage(path, outline, params):
+    """Percent of the field a candidate path sprays, leaving out the transit from and back to the start"""
+    spray_mask = np.ones(len(path) - 1, dtype=bool)
+    spray_mask[[0, -1]] = False
+    report = analyze_coverage(path, spray_mask, outline, params.spray_width_m,
+                              params.spray_width_m / COVERAGE_CELLS_PER_SWATH)
+    return report['coverage_pct']
+
+def _score(params, shape_type, pattern_type, rotation_deg):
+    path = generate_pattern(shape_type, pattern_type, params.radius_m, params.stripe_separation_m, rotation_deg,
+                            params.field_polygon)
+    outline = field_outline(shape_type, params.radius_m, rotation_deg, params.field_polygon)
+    length_m, turns, time_s = score_paths([path], params)
+    return {
+        'pattern_type': pattern_type,
+        'rotation_deg': float(rotation_deg),
+        'length_m': float(length_m[0]),
+        'turns': int(turns[0]),
+        'time_s': float(time_s[0]),
+        'coverage_pct': float(path_coverage(path, outline, params))
+    }
+
+def _score_polygon_angles(params, pattern_type, angles_deg):
+    return [_score(params, 'polygon', pattern_type, angle) for angle in angles_deg]
+
+def optimize_pattern(params, angles_deg=None, workers=None):
+    """Score every pattern type (and rotation angle where it matters), best configuration first.
+
+    Rotating a built-in shape moves its path rigidly, so each pattern is
+    scored once at the configured rotation. Polygon fields need fresh
+    stripes for each angle, so their zigzags are generated in a process
+    pool; inset spirals don't depend on the angle and are scored once.
+    Candidates covering COVERAGE_TOLERANCE_PCT less of the field than the
+    best one rank after all the others, so a spiral that stopped early
+    can't win by leaving part of the field unsprayed.
+    """
+    configured = params.rotation_deg % 360
+    if params.shape_type != 'polygon':
+        candidates = [_score(params, params.shape_type, pattern_type, configured) for pattern_type in PATTERN_TYPES]
+    else:
+        if angles_deg is None:
+            angles_deg = np.arange(0, 360, 1.0)
+        angles_deg = np.asarray(angles_deg, dtype=float)
+        candidates = [_score(params, 'polygon', pattern_type, configured) for pattern_type in ('spiral_out', 'spiral_in')]
+        
+        chunks = np.array_split(angles_deg, workers or 4)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_score_polygon_angles, params, 'zigzag', chunk)
+                       for chunk in chunks if len(chunk)]
+            candidates.extend(row for future in futures for row in future.result())
+    
+    best_coverage = max(c['coverage_pct'] for c in candidates)
+    candidates.sort(key=lambda c: (c['coverage_pct'] < best_coverage - COVERAGE_TOLERANCE_PCT, c['time_s']))
+    return candidates
@@ -0,0 +1,110 @@
+import time
+import numpy as np
+from .estimator import mission_points, estimate_path, mission_speeds, HOVER_COMMANDS
+from patterns import project_local
+
+class MissionProgress:
+    """Live progress of an uploaded mission from MISSION_CURRENT, MISSION_ITEM_REACHED and position.
+
+    Cumulative distance and planned time at every item are computed once.
+    An update only projects the position onto the leg toward the current
+    item, so percent complete, remaining distance and ETA cost O(1) however
+    long the mission is. Remaining time follows the planned time per leg
+    (speed schedule, climbs, turns and VTOL phases included).
+    """
+
+    def __init__(self, mission_items, params, home_lat, home_lon):
+        points, _ = mission_points(mission_items, home_lat, home_lon)
+        commands = np.array([item['command'] for item in mission_items])
+        hover = np.isin(commands[1:], HOVER_COMMANDS)
+        estimate = estimate_path(points, params, hover, mission_speeds(mission_items, params)[:-1])
+        legs = np.hypot(*np.diff(points[:, :2], axis=0).T)
+        # Plain lists and floats keep each update free of numpy call overhead
+        self.points = points[:, :2].tolist()
+        self.distance = np.concatenate(([0], np.cumsum(legs))).tolist()
+        self.eta = estimate['eta_s'].tolist()
+        self.total_m = self.distance[-1]
+        self.total_s = self.eta[-1]
+        self.home_lat = home_lat
+        self.home_lon = home_lon
+        # Meters per degree of longitude and latitude, as project_local maps them
+        self.meters_per_degree = project_local(home_lat + 1, home_lon + 1, home_lat, home_lon).tolist()
+        self.current = 0
+        self.reached = -1
+        self.flown_m = 0.0
+        self.elapsed_plan_s = 0.0
+        self.position = None
+        self.updated = None
+
+    def handle(self, msg):
+        """Feed any message; MISSION_CURRENT, MISSION_ITEM_REACHED and GLOBAL_POSITION_INT are used"""
+        msg_type = msg.get_type()
+        if msg_type == 'MISSION_CURRENT':
+            self.set_current(msg.seq)
+        elif msg_type == 'MISSION_ITEM_REACHED':
+            self.set_reached(msg.seq)
+        elif msg_type == 'GLOBAL_POSITION_INT':
+            self.update_position(msg.lat / 1e7, msg.lon / 1e7)
+
+    def handle_batch(self, batch):
+        for msg in batch:
+            self.handle(msg)
+
+    def set_current(self, seq):
+        if 0 <= seq < len(self.distance) and seq != self.current:
+            self.current = seq
+            self._at(seq, 0.0)
+
+    def set_reached(self, seq):
+        if 0 <= seq < len(self.distance):
+            self.reached = max(self.reached, seq)
+            if seq >= self.current:
+                self._at(seq, 1.0)
+
+    def update_position(self, lat, lon):
+        """Project the position onto the leg toward the current item"""
+        x = (lon - self.home_lon) * self.meters_per_degree[0]
+        y = (lat - self.home_lat) * self.meters_per_degree[1]
+        self.position = (x, y)
+        seq = self.current
+        if seq == 0:
+            return
+        start_x, start_y = self.points[seq - 1]
+        dx, dy = self.points[seq][0] - start_x, self.points[seq][1] - start_y
+        length_sq = dx * dx + dy * dy
+        if length_sq < 1e-12:
+            return
+        self._at(seq, min(max(((x - start_x) * dx + (y - start_y) * dy) / length_sq, 0.0), 1.0))
+
+    def _at(self, seq, fraction):
+        """Progress fraction of the way from item seq - 1 to item seq"""
+        if seq == 0:
+            self.flown_m, self.elapsed_plan_s = 0.0, 0.0
+        else:
+            self.flown_m = self.distance[seq - 1] + fraction * (self.distance[seq] - self.distance[seq - 1])
+            self.elapsed_plan_s = self.eta[seq - 1] + fraction * (self.eta[seq] - self.eta[seq - 1])
+        self.updated = time.time()
+
+    @property
+    def percent_complete(self):
+        return 100 * self.flown_m / self.total_m if self.total_m > 0 else 0.0
+
+    @property
+    def remaining_m(self):
+        return self.total_m - self.flown_m
+
+    @property
+    def remaining_s(self):
+        return self.total_s - self.elapsed_plan_s
+
+    def status(self):
+        remaining_s = self.remaining_s
+        return {
+            'current': self.current,
+            'reached': self.reached,
+            'percent_complete': self.percent_complete,
+            'flown_m': self.flown_m,
+            'remaining_m': self.remaining_m,
+            'remaining_s': remaining_s,
+            'eta': (self.updated or time.time()) + remaining_s
+        }
@@ -0,0 +1,166 @@
+import math
+import numpy as np
+from pymavlink import mavutil
+from mavlink import extract_tlog
+from patterns import project_local
+from .estimator import mission_points, spray_state, mission_speeds
+from .speed import SPEED_TYPE_GROUND
+
+MAX_RINGS = 32  # Beyond this many rings of empty cells every leg is checked directly
+
+class MissionIndex:
+    """Uniform grid over the legs of a mission, for nearest-leg queries.
+
+    Legs run between consecutive NAV items in the local frame around home
+    (project_local). With sprayed_only, only legs flown with the spray on
+    are indexed, so a resume never lands on a transit leg that happens to
+    pass nearby. A leg is listed in every cell it touches; a query scans
+    rings of cells outward and stops once no unscanned cell can be nearer,
+    so it touches a few legs however long the mission is.
+    """
+
+    def __init__(self, mission_items, params, home_lat, home_lon, cell_m=50, sprayed_only=True):
+        points, is_nav = mission_points(mission_items, home_lat, home_lon)
+        commands = np.array([item['command'] for item in mission_items])
+        leg_end = np.flatnonzero(is_nav & (commands != mavutil.mavlink.MAV_CMD_NAV_RETURN_TO_LAUNCH))
+        leg_end = leg_end[leg_end > 0]
+        if sprayed_only:
+            sprayed = spray_state(mission_items, params)[leg_end - 1]
+            if sprayed.any():
+                leg_end = leg_end[sprayed]
+
+        self.home_lat = home_lat
+        self.home_lon = home_lon
+        self.cell_m = float(cell_m)
+        self.seqs = leg_end.tolist()
+        self.starts = points[leg_end - 1, :2].tolist()
+        self.ends = points[leg_end, :2].tolist()
+        self.cells = {}
+        for leg, (start, end) in enumerate(zip(self.starts, self.ends)):
+            for cell in self._leg_cells(start, end):
+                self.cells.setdefault(cell, []).append(leg)
+        if self.cells:
+            cells = np.array(list(self.cells))
+            self.low, self.high = cells.min(axis=0).tolist(), cells.max(axis=0).tolist()
+
+    def _leg_cells(self, start, end):
+        # Samples no further apart than one cell, each with its neighbours:
+        # a superset of the cells the leg passes through
+        steps = max(1, int(math.ceil(math.hypot(end[0] - start[0], end[1] - start[1]) / self.cell_m)))
+        cells = set()
+        for k in range(steps + 1):
+            t = k / steps
+            i = math.floor((start[0] + t * (end[0] - start[0])) / self.cell_m)
+            j = math.floor((start[1] + t * (end[1] - start[1])) / self.cell_m)
+            for di in (-1, 0, 1):
+                for dj in (-1, 0, 1):
+                    cells.add((i + di, j + dj))
+        return cells
+
+    def _closest_on_leg(self, leg, x, y):
+        (start_x, start_y), (end_x, end_y) = self.starts[leg], self.ends[leg]
+        dx, dy = end_x - start_x, end_y - start_y
+        length_sq = dx * dx + dy * dy
+        t = 0.0 if length_sq < 1e-12 else min(max(((x - start_x) * dx + (y - start_y) * dy) / length_sq, 0.0), 1.0)
+        px, py = start_x + t * dx, start_y + t * dy
+        return math.hypot(x - px, y - py), t, px, py
+
+    def _ring(self, ci, cj, ring):
+        """Cells on the square ring ring cells out from (ci, cj)"""
+        if ring == 0:
+            yield ci, cj
+            return
+        for i in range(ci - ring, ci + ring + 1):
+            yield i, cj - ring
+            yield i, cj + ring
+        for j in range(cj - ring + 1, cj + ring):
+            yield ci - ring, j
+            yield ci + ring, j
+
+    def nearest_local(self, x, y):
+        """Nearest indexed leg to local (x, y), or None when nothing is indexed"""
+        if not self.cells:
+            return None
+        ci, cj = math.floor(x / self.cell_m), math.floor(y / self.cell_m)
+        # Rings closer in than the bounding box of the cells are empty
+        first = max(0, self.low[0] - ci, ci - self.high[0], self.low[1] - cj, cj - self.high[1])
+        best = None
+        seen = set()
+        for ring in range(first, first + MAX_RINGS + 1):
+            for cell in self._ring(ci, cj, ring):
+                for leg in self.cells.get(cell, ()):
+                    if leg in seen:
+                        continue
+                    seen.add(leg)
+                    hit = self._closest_on_leg(leg, x, y)
+                    if best is None or hit[0] < best[1][0]:
+                        best = (leg, hit)
+            # Cells of the next ring are at least ring cells away
+            if best is not None and best[1][0] <= ring * self.cell_m:
+                break
+        else:
+            # Far from the whole mission: check every leg
+            hits = [self._closest_on_leg(leg, x, y) for leg in range(len(self.seqs))]
+            leg = min(range(len(hits)), key=lambda k: hits[k][0])
+            best = (leg, hits[leg])
+        leg, (distance, fraction, px, py) = best
+        return {'seq': self.seqs[leg], 'fraction': fraction, 'distance_m': distance, 'x': px, 'y': py}
+
+    def nearest(self, lat, lon):
+        """Nearest leg to a global position.
+
+        Returns the seq of the item the leg leads to, how far along the leg
+        the closest point lies, its distance in meters and its lat/lon.
+        """
+        x, y = project_local(lat, lon, self.home_lat, self.home_lon).tolist()
+        hit = self.nearest_local(x, y)
+        if hit is not None:
+            meters_per_lon, meters_per_lat = project_local(
+                self.home_lat + 1, self.home_lon + 1, self.home_lat, self.home_lon).tolist()
+            hit['lat'] = self.home_lat + hit['y'] / meters_per_lat
+            hit['lon'] = self.home_lon + hit['x'] / meters_per_lon
+        return hit
+
+def jump_target(mission_items, params, lat, lon):
+    """Where to point a vehicle (set_current) to resume its on-board mission near (lat, lon).
+
+    mission_items is the mission as downloaded, with home at seq 0. A jump
+    skips the DO items before the target, so it goes to the NAV item that
+    starts the nearest leg and the leg is flown again whole, with its own DO
+    items. Returns the MissionIndex hit plus 'start' (the seq to jump to)
+    and (command, params...) tuples that restore what trim_mission would:
+    'commands' to send before the jump for the speed in force there, and
+    'on_arrival' to send once the start is reached for a spray that only
+    items before it turn on.
+    """
+    hit = MissionIndex(mission_items, params, mission_items[0]['x'], mission_items[0]['y']).nearest(lat, lon)
+    if hit is None:
+        return None
+    commands = np.array([item['command'] for item in mission_items[:hit['seq']]])
+    # Item 0 is home, which can't be jumped to; the first leg is flown from wherever the vehicle is
+    start = max(1, int(np.flatnonzero(commands < mavutil.mavlink.MAV_CMD_NAV_LAST)[-1]))
+    hit['start'] = start
+    speed = float(mission_speeds(mission_items, params)[start])
+    hit['commands'] = [(mavutil.mavlink.MAV_CMD_DO_CHANGE_SPEED, SPEED_TYPE_GROUND, speed, -1)]
+    replayed = spray_state(mission_items[start:hit['seq']], params)
+    hit['on_arrival'] = []
+    if spray_state(mission_items, params)[hit['seq'] - 1] and not replayed[-1:].any():
+        hit['on_arrival'].append((mavutil.mavlink.MAV_CMD_DO_SET_SERVO, params.servo_channel, params.servo_pwm))
+    return hit
+
+def last_spray_position(tlog_path, params):
+    """(lat, lon) of the last position reported with the spray servo on in a tlog, or None"""
+    servo = f'servo{params.servo_channel}_raw'
+    columns, _ = extract_tlog(tlog_path, {'GLOBAL_POSITION_INT': ['lat', 'lon'], 'SERVO_OUTPUT_RAW': [servo]})
+    pwm = columns[f'SERVO_OUTPUT_RAW.{servo}'].astype(float)
+    threshold = (params.servo_pwm + params.servo_pwm_off) / 2
+    spraying = (pwm > threshold) == (params.servo_pwm > params.servo_pwm_off)
+    if not spraying.any():
+        return None
+    last_on = columns['SERVO_OUTPUT_RAW.time_us'][np.flatnonzero(spraying)[-1]]
+    # The first position reported after the spray was last seen on
+    times = columns['GLOBAL_POSITION_INT.time_us']
+    if len(times) == 0:
+        return None
+    k = min(int(np.searchsorted(times, last_on, side='right')), len(times) - 1)
+    return columns['GLOBAL_POSITION_INT.lat'][k] / 1e7, columns['GLOBAL_POSITION_INT.lon'][k] / 1e7
@@ -0,0 +1,108 @@
+import numpy as np
+from pymavlink import mavutil
+from mavlink import mission_item
+from .estimator import mission_points, mission_speeds, spray_state, estimate_mission
+from .speed import SPEED_TYPE_GROUND
+
+SORTIE_EXTRA_ITEMS = 5  # Home placeholder, speed and spray restore, spray off, return to launch
+
+def split_sorties(mission_items, params, home_lat, home_lon, times=None):
+    """Cut a mission into sorties that fit the battery and the autopilot's item limit.
+
+    times holds the cumulative flight time at every item (defaults to the
+    estimate_mission ETAs). With that prefix sum, each sortie's flight
+    time including transit from home to its first item and back costs O(1)
+    per candidate end. Cuts fall only before NAV items. Every sortie after the
+    first starts from a home placeholder and flies straight to its resume
+    point, restoring the scheduled speed and the spray there if it was on.
+    Every sortie ends with the spray off and a return to launch. A mission
+    that already fits both is returned whole and unchanged, as one sortie.
+    """
+    count = len(mission_items)
+    if count == 0:
+        return []
+    points, is_nav = mission_points(mission_items, home_lat, home_lon)
+    if times is None:
+        times = estimate_mission(mission_items, params, home_lat, home_lon)['eta_s']
+    times = np.asarray(times, dtype=float)
+    home_time = np.hypot(points[:, 0], points[:, 1]) / params.cruise_speed_ms
+    spray_on = spray_state(mission_items, params)
+    speeds = mission_speeds(mission_items, params)
+
+    budget = params.battery_endurance_s * (1 - params.battery_reserve)
+    if count <= params.max_mission_items and home_time[0] + times[-1] - times[0] + home_time[-1] <= budget:
+        return [[dict(item) for item in mission_items]]
+
+    # Split: every sortie needs room for the items added around its cut
+    capacity = params.max_mission_items - SORTIE_EXTRA_ITEMS
+    if capacity < 1:
+        raise ValueError(f"max_mission_items must leave room for {SORTIE_EXTRA_ITEMS} sortie items")
+    can_end = np.append(is_nav[1:], True)
+
+    bounds = []
+    start = 0
+    while start < count:
+        ends = np.arange(start, min(count, start + capacity))
+        flight = home_time[start] + times[ends] - times[start] + home_time[ends]
+        fits = np.flatnonzero((flight <= budget) & can_end[ends])
+        if len(fits) == 0:
+            raise ValueError(f"Mission item {start} can't be reached and returned from within the battery budget")
+        end = int(ends[fits[-1]]) + 1
+        bounds.append((start, end))
+        start = end
+
+    home = (home_lat, home_lon, params.altitude)
+    sorties = []
+    for start, end in bounds:
+        if start > 0:
+            items = _resume_items(mission_items, start, params, home, speeds, spray_on)
+            items.extend(dict(item) for item in mission_items[start + 1:end])
+        else:
+            items = [dict(item) for item in mission_items[start:end]]
+        last = mission_items[end - 1]
+        items.append(mission_item(
+            0, mavutil.mavlink.MAV_CMD_DO_SET_SERVO, last['x'], last['y'], last['z'],
+            param1=params.servo_channel, param2=params.servo_pwm_off, is_spray=True))
+        items.append(mission_item(0, mavutil.mavlink.MAV_CMD_NAV_RETURN_TO_LAUNCH))
+        for seq, item in enumerate(items):
+            item['seq'] = seq
+        sorties.append(items)
+    return sorties
+
+def _resume_items(mission_items, start, params, home, speeds, spray_on, entry=None):
+    """Opening items of a mission resumed at item start.
+
+    A home placeholder, the resume point (item start, or an entry waypoint
+    on the leg before it) and, once there, the speed and spray in force on
+    that leg.
+    """
+    if entry is None:
+        resume = dict(mission_items[start])
+    else:
+        resume = mission_item(0, mavutil.mavlink.MAV_CMD_NAV_WAYPOINT, *entry)
+    items = [mission_item(0, mavutil.mavlink.MAV_CMD_NAV_WAYPOINT, *home), resume]
+    if speeds[start - 1] != params.cruise_speed_ms:
+        items.append(mission_item(
+            0, mavutil.mavlink.MAV_CMD_DO_CHANGE_SPEED, resume['x'], resume['y'], resume['z'],
+            param1=SPEED_TYPE_GROUND, param2=float(speeds[start - 1]), param3=-1))
+    if spray_on[start - 1]:
+        items.append(mission_item(
+            0, mavutil.mavlink.MAV_CMD_DO_SET_SERVO, resume['x'], resume['y'], resume['z'],
+            param1=params.servo_channel, param2=params.servo_pwm, is_spray=True))
+    return items
+
+def trim_mission(mission_items, start, params, home_lat, home_lon, entry=None):
+    """The rest of a mission from item start, for upload after an abort or battery swap.
+
+    entry is an optional global (lat, lon, alt) on the leg into item start
+    to rejoin at, such as where spraying stopped.
+    """
+    if start <= 0:
+        return [dict(item) for item in mission_items]
+    home = (home_lat, home_lon, params.altitude)
+    items = _resume_items(mission_items, start, params, home, mission_speeds(mission_items, params),
+                         spray_state(mission_items, params), entry)
+    items.extend(dict(item) for item in mission_items[start + (entry is None):])
+    for seq, item in enumerate(items):
+        item['seq'] = seq
+    return items
@@ -0,0 +1,57 @@
+import numpy as np
+from pymavlink import mavutil
+from mavlink import mission_item
+from .estimator import mission_points, spray_state
+
+SPEED_TYPE_GROUND = 1
+SEGMENT_CLASSES = ('turn', 'stripe', 'transit')
+
+def classify_legs(mission_items, params, home_lat, home_lon, straight_tolerance_deg=5):
+    """Class of every leg between consecutive NAV items: 0 turn, 1 stripe, 2 transit.
+
+    Legs are merged into runs while the heading stays within
+    straight_tolerance_deg and the spray state doesn't change, so spray
+    points and exclusion splits don't break up a stripe. Runs shorter than
+    straight_min_m are turns. Longer runs are stripes when spraying and transit
+    otherwise. Returns the NAV item indices and the per-leg classes.
+    """
+    points, is_nav = mission_points(mission_items, home_lat, home_lon)
+    nav = np.flatnonzero(is_nav)
+    if len(nav) < 2:
+        return nav, np.zeros(0, dtype=int)
+    legs = np.diff(points[nav, :2], axis=0)
+    lengths = np.hypot(legs[:, 0], legs[:, 1])
+    spraying = spray_state(mission_items, params)[nav[1:] - 1]
+
+    headings = np.arctan2(legs[:, 1], legs[:, 0])
+    bend = np.abs((np.diff(headings) + np.pi) % (2 * np.pi) - np.pi)
+    moving = (lengths[:-1] > 1e-6) & (lengths[1:] > 1e-6)
+    breaks = (moving & (bend > np.radians(straight_tolerance_deg))) | (spraying[1:] != spraying[:-1])
+    run = np.concatenate(([0], np.cumsum(breaks)))
+    straight = np.bincount(run, lengths)[run] >= params.straight_min_m
+    classes = np.where(straight, np.where(spraying, 1, 2), 0)
+    return nav, classes
+
+def schedule_speeds(mission_items, params, home_lat, home_lon):
+    """Insert the fewest DO_CHANGE_SPEED items for fast stripes and transit and slow turns.
+
+    A speed change follows the NAV item that starts a leg whose class speed
+    differs from the speed already in force, so runs of the same class share
+    one item. Spray triggers stay on their waypoints, so their spacing on the
+    ground doesn't change with speed. Returns renumbered mission items.
+    """
+    nav, classes = classify_legs(mission_items, params, home_lat, home_lon)
+    speeds = np.array([params.turn_speed_ms, params.stripe_speed_ms, params.transit_speed_ms])[classes]
+    previous = np.concatenate(([params.cruise_speed_ms], speeds[:-1]))
+    changes = dict(zip(nav[:-1][speeds != previous].tolist(), speeds[speeds != previous].tolist()))
+
+    items = []
+    for i, item in enumerate(mission_items):
+        items.append(dict(item))
+        if i in changes:
+            items.append(mission_item(
+                0, mavutil.mavlink.MAV_CMD_DO_CHANGE_SPEED, item['x'], item['y'], item['z'],
+                param1=SPEED_TYPE_GROUND, param2=changes[i], param3=-1))
+    for seq, item in enumerate(items):
+        item['seq'] = seq
+    return items
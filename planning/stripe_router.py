@@ -0,0 +1,317 @@
+import math
+import time
+import numpy as np
+
+START, END = -1, -2
+
+def zigzag_stripes(waypoints):
+    """Stripe segments of a zigzag path: the waypoint pairs between the start and end points"""
+    points = np.asarray(waypoints[1:-1], dtype=float)
+    stripes = points[:len(points) // 2 * 2].reshape(-1, 2, 2)
+    lengths = np.hypot(*(stripes[:, 1] - stripes[:, 0]).T)
+    return stripes[lengths > 1e-6]
+
+def _angle(a, b):
+    return np.arccos(np.clip(np.einsum('...i,...i->...', a, b), -1, 1))
+
+def link_costs(p, h, q, g, turn_radius_m):
+    """Transit cost from exit point p with heading h to entry point q with heading g.
+
+    The straight-line distance, plus the turn arcs at turn_radius_m, plus a
+    bulb-turn allowance for reversals tighter than twice the turn radius.
+    Arguments broadcast as (..., 2) arrays.
+    """
+    v = q - p
+    length = np.hypot(v[..., 0], v[..., 1])
+    if turn_radius_m <= 0:
+        return length
+    with np.errstate(divide='ignore', invalid='ignore'):
+        u = np.where(length[..., None] > 1e-9, v / length[..., None], h)
+    turn = _angle(h, u) + _angle(u, g)
+    reversal = np.einsum('...i,...i->...', h, g) < 0
+    bulb = np.where(reversal, 2 * np.maximum(0, 2 * turn_radius_m - length), 0)
+    return length + turn_radius_m * turn + bulb
+
+class _Router:
+    def __init__(self, stripes, start, end, turn_radius_m, neighbours):
+        self.turn_radius = float(turn_radius_m)
+        self.start = tuple(map(float, start))
+        self.end = None if end is None else tuple(map(float, end))
+
+        # Index 0 flies the stripe as given, index 1 flies it backwards
+        entry = np.stack((stripes[:, 0], stripes[:, 1]), axis=1)
+        exit_ = np.stack((stripes[:, 1], stripes[:, 0]), axis=1)
+        direction = stripes[:, 1] - stripes[:, 0]
+        direction /= np.hypot(*direction.T)[:, None]
+        heading = np.stack((direction, -direction), axis=1)
+        self.entry_np, self.exit_np, self.heading_np = entry, exit_, heading
+        self.entry = entry.tolist()
+        self.exit = exit_.tolist()
+        self.heading = heading.tolist()
+        self.candidates, self.candidate_costs = self._candidates(stripes, neighbours)
+
+    def _candidates(self, stripes, neighbours):
+        """The cheapest next stripes of each stripe, from its neighbours in offset order.
+
+        Stripes are parallel, so sorting them by their offset across the stripe
+        direction puts the nearest ones within a small window. Costs for all
+        four end combinations are precomputed for that window only.
+        """
+        count = len(stripes)
+        reference = self.heading_np[0, 0]
+        aligned = np.where((self.heading_np[:, 0] @ reference)[:, None] < 0,
+                           -self.heading_np[:, 0], self.heading_np[:, 0])
+        direction = aligned.mean(axis=0)
+        direction /= np.hypot(*direction)
+        normal = np.array([-direction[1], direction[0]])
+        middle = stripes.mean(axis=1)
+        order = np.lexsort((middle @ direction, middle @ normal))
+        rank = np.empty(count, dtype=int)
+        rank[order] = np.arange(count)
+
+        window = np.concatenate((np.arange(-2 * neighbours, 0), np.arange(1, 2 * neighbours + 1)))
+        window_idx = order[np.clip(rank[:, None] + window, 0, count - 1)]
+
+        costs = link_costs(
+            self.exit_np[:, None, :, None, :], self.heading_np[:, None, :, None, :],
+            self.entry_np[window_idx][:, :, None, :, :], self.heading_np[window_idx][:, :, None, :, :],
+            self.turn_radius)
+        best = costs.min(axis=(2, 3))
+        best[window_idx == np.arange(count)[:, None]] = np.inf
+        # Windows clipped at either end repeat stripes, keep one copy
+        repeated = np.zeros_like(best, dtype=bool)
+        repeated[:, 1:] = window_idx[:, 1:] == window_idx[:, :-1]
+        best[repeated] = np.inf
+
+        k = min(neighbours, max(1, count - 1))
+        pick = np.argsort(best, axis=1)[:, :k]
+        candidates = np.take_along_axis(window_idx, pick, axis=1)
+        candidate_costs = np.take_along_axis(costs, pick[:, :, None, None], axis=1)
+        valid = np.take_along_axis(best, pick, axis=1) < np.inf
+        return [row[ok].tolist() for row, ok in zip(candidates, valid)], candidate_costs
+
+    def edge(self, s1, f1, s2, f2):
+        if s2 == END and self.end is None:
+            return 0.0
+        if s1 == START:
+            px, py = self.start
+            hx = hy = None
+        else:
+            px, py = self.exit[s1][f1]
+            hx, hy = self.heading[s1][f1]
+        if s2 == END:
+            qx, qy = self.end
+            gx = gy = None
+        else:
+            qx, qy = self.entry[s2][f2]
+            gx, gy = self.heading[s2][f2]
+
+        vx, vy = qx - px, qy - py
+        length = math.hypot(vx, vy)
+        if self.turn_radius <= 0:
+            return length
+        if length > 1e-9:
+            ux, uy = vx / length, vy / length
+        elif hx is not None:
+            ux, uy = hx, hy
+        else:
+            ux, uy = gx, gy
+        turn = 0.0
+        if hx is not None:
+            turn += math.acos(max(-1.0, min(1.0, hx * ux + hy * uy)))
+        if gx is not None:
+            turn += math.acos(max(-1.0, min(1.0, ux * gx + uy * gy)))
+        cost = length + self.turn_radius * turn
+        if hx is not None and gx is not None and hx * gx + hy * gy < 0:
+            cost += 2 * max(0.0, 2 * self.turn_radius - length)
+        return cost
+
+    def route_cost(self, order, flips):
+        return sum(self.edge(order[k], flips[k], order[k + 1], flips[k + 1]) for k in range(len(order) - 1))
+
+    def given_order(self):
+        """The stripes in their original order, each entered at the end nearer the last exit"""
+        order, flips = [START], [0]
+        exit_point = np.asarray(self.start)
+        for s in range(len(self.entry)):
+            gaps = np.hypot(*(self.entry_np[s] - exit_point).T)
+            flip = int(np.argmin(gaps))
+            order.append(s)
+            flips.append(flip)
+            exit_point = self.exit_np[s, flip]
+        order.append(END)
+        flips.append(0)
+        return order, flips
+
+    def nearest_neighbour(self):
+        count = len(self.entry)
+        unvisited = np.ones(count, dtype=bool)
+        order, flips = [START], [0]
+
+        first = np.hypot(*(self.entry_np - np.asarray(self.start)).transpose(2, 0, 1))
+        current, flip = np.unravel_index(int(np.argmin(first)), first.shape)
+        while True:
+            order.append(int(current))
+            flips.append(int(flip))
+            unvisited[current] = False
+            if len(order) == count + 1:
+                break
+
+            candidates = self.candidates[current]
+            free = [k for k, c in enumerate(candidates) if unvisited[c]]
+            if free:
+                costs = self.candidate_costs[current, free, flip]
+                k, flip = np.unravel_index(int(np.argmin(costs)), costs.shape)
+                current = candidates[free[k]]
+            else:
+                # Every neighbour is taken, fall back to the closest free stripe end
+                remaining = np.flatnonzero(unvisited)
+                gaps = np.hypot(*(self.entry_np[remaining] - self.exit_np[current, flip]).transpose(2, 0, 1))
+                k, flip = np.unravel_index(int(np.argmin(gaps)), gaps.shape)
+                current = remaining[k]
+
+        order.append(END)
+        flips.append(0)
+        return order, flips
+
+    def improve(self, order, flips, deadline):
+        """2-opt and Or-opt over neighbour lists until no move helps or time runs out"""
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = self._two_opt(order, flips, deadline)
+            improved = self._or_opt(order, flips, deadline) or improved
+        return order, flips
+
+    def _two_opt(self, order, flips, deadline):
+        edge = self.edge
+        position = {s: k for k, s in enumerate(order)}
+        improved = False
+        last = len(order) - 1
+
+        for i in range(last):
+            if i % 256 == 0 and time.perf_counter() > deadline:
+                break
+            a, b = order[i], order[i + 1]
+            if a == START:
+                continue
+            for c in self.candidates[a]:
+                a, fa, b, fb = order[i], flips[i], order[i + 1], flips[i + 1]
+                j = position[c]
+                if j > i + 1:
+                    # a b ... c d  ->  a c' ... b' d
+                    d, fd = order[j + 1], flips[j + 1]
+                    delta = (edge(a, fa, c, 1 - flips[j]) + edge(b, 1 - fb, d, fd)
+                             - edge(a, fa, b, fb) - edge(c, flips[j], d, fd))
+                    lo, hi = i + 1, j
+                elif j < i:
+                    # c e ... a b  ->  c a' ... e' b
+                    e, fe = order[j + 1], flips[j + 1]
+                    delta = (edge(c, flips[j], a, 1 - fa) + edge(e, 1 - fe, b, fb)
+                             - edge(c, flips[j], e, fe) - edge(a, fa, b, fb))
+                    lo, hi = j + 1, i
+                else:
+                    continue
+                if delta < -1e-7:
+                    order[lo:hi + 1] = order[lo:hi + 1][::-1]
+                    flips[lo:hi + 1] = [1 - f for f in flips[lo:hi + 1][::-1]]
+                    for k in range(lo, hi + 1):
+                        position[order[k]] = k
+                    improved = True
+        return improved
+
+    def _or_opt(self, order, flips, deadline):
+        edge = self.edge
+        position = {s: k for k, s in enumerate(order)}
+        improved = False
+        i = 1
+        steps = 0
+        while i < len(order) - 1:
+            steps += 1
+            if steps % 64 == 0 and time.perf_counter() > deadline:
+                break
+            moved = False
+            for size in (1, 2, 3):
+                if i + size > len(order) - 1:
+                    break
+                seg, seg_flips = order[i:i + size], flips[i:i + size]
+                prev_s, prev_f = order[i - 1], flips[i - 1]
+                next_s, next_f = order[i + size], flips[i + size]
+                gain = (edge(prev_s, prev_f, seg[0], seg_flips[0])
+                        + edge(seg[-1], seg_flips[-1], next_s, next_f)
+                        - edge(prev_s, prev_f, next_s, next_f))
+                if gain <= 1e-7:
+                    continue
+
+                best = None
+                for c in self.candidates[seg[0]] + self.candidates[seg[-1]]:
+                    k = position[c]
+                    for left in (k - 1, k):
+                        # Only links that survive taking the segment out
+                        if not (left + 1 < i or left >= i + size) or left + 1 >= len(order):
+                            continue
+                        l_s, l_f, r_s, r_f = order[left], flips[left], order[left + 1], flips[left + 1]
+                        base = edge(l_s, l_f, r_s, r_f)
+                        forward = edge(l_s, l_f, seg[0], seg_flips[0]) + edge(seg[-1], seg_flips[-1], r_s, r_f) - base
+                        backward = edge(l_s, l_f, seg[-1], 1 - seg_flips[-1]) + edge(seg[0], 1 - seg_flips[0], r_s, r_f) - base
+                        for cost, reverse in ((forward, False), (backward, True)):
+                            if cost < gain - 1e-7 and (best is None or cost < best[0]):
+                                best = (cost, left, reverse)
+                if best is None:
+                    continue
+
+                _, left, reverse = best
+                if reverse:
+                    seg, seg_flips = seg[::-1], [1 - f for f in seg_flips[::-1]]
+                if left < i:
+                    lo, hi = left + 1, i + size
+                    order[lo:hi] = seg + order[lo:i]
+                    flips[lo:hi] = seg_flips + flips[lo:i]
+                else:
+                    lo, hi = i, left + 1
+                    order[lo:hi] = order[i + size:left + 1] + seg
+                    flips[lo:hi] = flips[i + size:left + 1] + seg_flips
+                for k in range(lo, hi):
+                    position[order[k]] = k
+                improved = moved = True
+                break
+            if not moved:
+                i += 1
+        return improved
+
+def order_stripes(stripes, start=(0, 0), end=(0, 0), turn_radius_m=0, neighbours=8, time_limit_s=1.0):
+    """Order and orient stripe segments to keep transit between them short.
+
+    The cheaper of a nearest-neighbour tour and the given stripe order is improved with 2-opt and Or-opt
+    moves over each stripe's precomputed cheapest neighbours. With a turn
+    radius, reversals onto a stripe closer than two radii cost a bulb turn,
+    so the tour learns to skip adjacent stripes. end=None leaves the end of
+    the route free. Returns (entry, exit) segments in flying order.
+    """
+    stripes = np.asarray(stripes, dtype=float).reshape(-1, 2, 2)
+    if len(stripes) == 0:
+        return []
+    deadline = time.perf_counter() + time_limit_s
+
+    router = _Router(stripes, start, end, turn_radius_m, neighbours)
+    # The generator's own sweep is often the better seed for simple fields
+    order, flips = min(router.nearest_neighbour(), router.given_order(), key=lambda seed: router.route_cost(*seed))
+    if len(stripes) > 2:
+        order, flips = router.improve(order, flips, deadline)
+
+    segments = []
+    for s, f in zip(order[1:-1], flips[1:-1]):
+        entry, exit_ = router.entry[s][f], router.exit[s][f]
+        segments.append((tuple(entry), tuple(exit_)))
+    return segments
+
+def stripe_path(segments, start=(0, 0), end=(0, 0)):
+    """Waypoints flying the segments in order, and a spray flag for every leg"""
+    waypoints = [tuple(start)]
+    spray_mask = []
+    for entry, exit_ in segments:
+        waypoints.extend((entry, exit_))
+        spray_mask.extend((False, True))
+    if end is not None:
+        waypoints.append(tuple(end))
+        spray_mask.append(False)
+    return waypoints, spray_mask
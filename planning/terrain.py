@@ -0,0 +1,134 @@
+import math
+import os
+from collections import OrderedDict
+import numpy as np
+from patterns import project_local
+
+HGT_VOID = -32768
+
+class TerrainModel:
+    """Ground elevation from local SRTM .hgt tiles, read through numpy.memmap.
+
+    Tiles are 1x1 degree grids of big-endian int16 meters, north row first,
+    named like N35E149.hgt after their south-west corner. Both SRTM1 (3601
+    samples) and SRTM3 (1201 samples) work. Up to cache_tiles tiles stay
+    mapped, least recently used dropped first. Nothing is downloaded:
+    missing tiles and voids read as NaN.
+    """
+
+    def __init__(self, directory, cache_tiles=8):
+        self.directory = directory
+        self.cache_tiles = cache_tiles
+        self.tiles = OrderedDict()
+
+    @staticmethod
+    def tile_name(lat, lon):
+        return f"{'N' if lat >= 0 else 'S'}{abs(lat):02d}{'E' if lon >= 0 else 'W'}{abs(lon):03d}.hgt"
+
+    def tile(self, lat, lon):
+        key = (lat, lon)
+        if key in self.tiles:
+            self.tiles.move_to_end(key)
+            return self.tiles[key]
+
+        path = os.path.join(self.directory, self.tile_name(lat, lon))
+        data = None
+        if os.path.exists(path):
+            size = int(math.isqrt(os.path.getsize(path) // 2))
+            data = np.memmap(path, dtype='>i2', mode='r', shape=(size, size))
+        self.tiles[key] = data
+        if len(self.tiles) > self.cache_tiles:
+            self.tiles.popitem(last=False)
+        return data
+
+    def elevation(self, lat, lon):
+        """Bilinearly interpolated ground elevation in meters for arrays of lat/lon"""
+        lat = np.asarray(lat, dtype=float).ravel()
+        lon = np.asarray(lon, dtype=float).ravel()
+        heights = np.full(lat.shape, np.nan)
+        tile_lat = np.floor(lat).astype(int)
+        tile_lon = np.floor(lon).astype(int)
+
+        # Points nearly always share one tile, so only sort when they don't
+        keys = (tile_lat + 90) * 360 + (tile_lon + 180)
+        if len(keys) == 0:
+            return heights
+        if np.all(keys == keys[0]):
+            groups = [np.arange(len(keys))]
+        else:
+            order = np.argsort(keys, kind='stable')
+            groups = np.split(order, np.flatnonzero(np.diff(keys[order])) + 1)
+
+        for idx in groups:
+            key_lat, key_lon = int(tile_lat[idx[0]]), int(tile_lon[idx[0]])
+            data = self.tile(key_lat, key_lon)
+            if data is None:
+                continue
+            size = data.shape[0] - 1
+            row = (key_lat + 1 - lat[idx]) * size
+            col = (lon[idx] - key_lon) * size
+            r0 = np.clip(np.floor(row).astype(int), 0, size - 1)
+            c0 = np.clip(np.floor(col).astype(int), 0, size - 1)
+            fr, fc = row - r0, col - c0
+
+            corners = np.stack((data[r0, c0], data[r0, c0 + 1], data[r0 + 1, c0], data[r0 + 1, c0 + 1])).astype(float)
+            corners[corners == HGT_VOID] = np.nan
+            top = corners[0] * (1 - fc) + corners[1] * fc
+            bottom = corners[2] * (1 - fc) + corners[3] * fc
+            heights[idx] = top * (1 - fr) + bottom * fr
+        return heights
+
+def follow_terrain(waypoints_global, spray_mask, terrain, params, home_lat, home_lon):
+    """Hold params.altitude above ground along the path.
+
+    Every leg is sampled every terrain_spacing_m. Samples become extra
+    waypoints until straight legs between them stay within
+    terrain_tolerance_m of the ground profile, so legs follow hills without
+    flooding the mission. Altitudes stay relative to home, offset by the
+    ground height difference. Returns the new waypoints and their per-leg
+    spray mask.
+    """
+    points = np.asarray(waypoints_global, dtype=float)
+    if len(points) < 2:
+        return list(waypoints_global), list(spray_mask or [])
+    if spray_mask is None:
+        spray_mask = [True] * (len(points) - 1)
+
+    local = project_local(points[:, 0], points[:, 1], home_lat, home_lon)
+    lengths = np.hypot(*np.diff(local, axis=0).T)
+    samples = np.maximum(1, np.ceil(lengths / params.terrain_spacing_m)).astype(int)
+    leg = np.repeat(np.arange(len(lengths)), samples)
+    first = np.repeat(np.cumsum(samples) - samples, samples)
+    t = (np.arange(len(leg)) - first) / samples[leg]
+
+    lat = np.append(points[leg, 0] + t * (points[leg + 1, 0] - points[leg, 0]), points[-1, 0])
+    lon = np.append(points[leg, 1] + t * (points[leg + 1, 1] - points[leg, 1]), points[-1, 1])
+    is_waypoint = np.append(t == 0, True)
+
+    ground = terrain.elevation(lat, lon)
+    home_ground = terrain.elevation(np.array([home_lat]), np.array([home_lon]))[0]
+    if np.isnan(home_ground):
+        home_ground = 0.0
+    ground = np.where(np.isnan(ground), home_ground, ground)
+
+    # Douglas-Peucker on the ground profile, one split per span and pass,
+    # all spans at once
+    keep = is_waypoint.copy()
+    index = np.arange(len(ground))
+    while True:
+        kept = np.flatnonzero(keep)
+        span = np.clip(np.searchsorted(kept, index, side='right') - 1, 0, len(kept) - 2)
+        a, b = kept[span], kept[span + 1]
+        chord = ground[a] + (index - a) / (b - a) * (ground[b] - ground[a])
+        deviation = np.where(keep, 0, np.abs(ground - chord))
+        candidates = np.flatnonzero(deviation > params.terrain_tolerance_m)
+        if len(candidates) == 0:
+            break
+        candidates = candidates[np.lexsort((-deviation[candidates], span[candidates]))]
+        _, worst = np.unique(span[candidates], return_index=True)
+        keep[candidates[worst]] = True
+
+    altitude = params.altitude + ground[keep] - home_ground
+    new_waypoints = list(zip(lat[keep].tolist(), lon[keep].tolist(), altitude.tolist()))
+    new_mask = np.asarray(spray_mask, dtype=bool)[leg[keep[:-1]]].tolist()
+    return new_waypoints, new_mask
@@ -0,0 +1,62 @@
+import glob
+import os
+import sys
+import time
+from pymavlink import mavutil
+from config import MissionParams
+from mavlink import extract_tlogs, flight_fields
+
+def tlog_paths(arguments):
+    paths = []
+    for argument in arguments:
+        if os.path.isdir(argument):
+            paths.extend(sorted(glob.glob(os.path.join(argument, '*.tlog'))))
+        else:
+            paths.append(argument)
+    return paths
+
+def benchmark(paths, fields, output_dir, processes):
+    """Messages per second per core of the extractor against decoding each message with pymavlink"""
+    # The first pass also indexes tlogs recorded without one
+    for label in ('First pass', 'Indexed'):
+        started = time.time()
+        results = extract_tlogs(paths, fields, output_dir, processes)
+        wall_s = time.time() - started
+        messages = sum(result['messages'] for result in results)
+        cpu_s = max(sum(result['cpu_s'] for result in results), 1e-9)
+        print(f"{label}: {messages} messages from {len(paths)} tlogs in {wall_s:.2f} s, "
+              f"{messages / cpu_s:,.0f} messages/s per core")
+
+    # Baseline on the first tlog: pymavlink decodes every message
+    log = mavutil.mavlink_connection(paths[0])
+    types = set(fields)
+    started = time.process_time()
+    count = 0
+    while True:
+        msg = log.recv_match(type=types)
+        if msg is None:
+            break
+        count += 1
+    baseline_s = max(time.process_time() - started, 1e-9)
+    print(f"pymavlink: {results[0]['messages'] / baseline_s:,.0f} messages/s per core on {paths[0]}")
+
+def main():
+    params = MissionParams()
+    arguments = [argument for argument in sys.argv[1:] if not argument.startswith('--')]
+    paths = tlog_paths(arguments or [params.tlog_dir or '.'])
+    if not paths:
+        print("No .tlog files found")
+        return
+    fields = flight_fields(params)
+    output_dir = params.extract_dir
+    processes = params.extract_processes
+
+    if '--benchmark' in sys.argv:
+        benchmark(paths, fields, output_dir, processes)
+        return
+
+    for result in extract_tlogs(paths, fields, output_dir, processes, params.extract_memmap):
+        print(f"{result['path']}: {result['rows']} rows of {result['messages']} messages -> {result['output']}")
+
+if __name__ == "__main__":
+    main()
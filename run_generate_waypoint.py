@@ -1,103 +1,284 @@
-import math
-from pymavlink import mavutil
+import glob
+import os
+import time
 from config import MissionParams
-from mavlink import MissionHandler
+from mavlink import (MissionHandler, MissionValidationError, build_mission_items, build_fence_items,
+                     build_rally_items, validate_mission)
 from patterns import *
+from planning import (optimize_pattern, order_stripes, stripe_path, zigzag_stripes, dubins_stripe_path,
+                      plan_fields, partition_coverage, split_sorties, schedule_speeds, estimate_path,
+                      estimate_mission, TerrainModel, follow_terrain, fence_polygon, rally_points,
+                      analyze_coverage, CoverageTracker, MissionProgress, MissionIndex, jump_target,
+                      last_spray_position, trim_mission)
 
-def main():
-    params = MissionParams()
-    handler = MissionHandler(params.connection_string)
+def to_global(points, params, start_lat, start_lon):
+    """(lat, lon, altitude) of local (x, y) points around the start position"""
+    points_global = []
+    for x_rot, y_rot in points:
+        lat, lon = unproject_local(x_rot, y_rot, start_lat, start_lon)
+        points_global.append((float(lat), float(lon), params.altitude))
+    return points_global
+
+def build_mission(waypoints_rotated, spray_mask, params, start_lat, start_lon):
+    """Mission items for local waypoints around the start position"""
+    # Split legs that cross exclusion zones
+    exclusion_index = ExclusionIndex(params.exclusion_zones, params.exclusion_cell_m)
+    waypoints_clipped, spray_mask = clip_path(waypoints_rotated, exclusion_index, spray_mask)
     
-    # Get current position
-    msg = handler.master.recv_match(type='GLOBAL_POSITION_INT', blocking=True)
-    start_lat = msg.lat / 1e7
-    start_lon = msg.lon / 1e7
+    # Convert to global coordinates
+    waypoints_global = to_global(waypoints_clipped, params, start_lat, start_lon)
     
-    # Generate waypoints
-    generators = {
-        'circle': {
-            'zigzag': circle_zigzag,
-            'spiral_out': lambda r, s: circle_spiral(r, s, 'out'),
-            'spiral_in': lambda r, s: circle_spiral(r, s, 'in')
-        },
-        'square': {
-            'zigzag': square_zigzag,
-            'spiral_out': lambda r, s: square_spiral(r, s, 'out'),
-            'spiral_in': lambda r, s: square_spiral(r, s, 'in')
-        },
-        'triangle': {
-            'zigzag': triangle_zigzag,
-            'spiral_out': lambda r, s: triangle_spiral(r, s, 'out'),
-            'spiral_in': lambda r, s: triangle_spiral(r, s, 'in')
-        }
-    }
-    
-    generator = generators[params.shape_type][params.pattern_type]
-    waypoints_local = generator(params.radius_m, params.stripe_separation_m)
-    
-    # Rotate and convert to global coordinates
-    rotation_rad = math.radians(params.rotation_deg)
-    waypoints_global = []
-    for x, y in waypoints_local:
-        x_rot, y_rot = rotate_point(x, y, rotation_rad)
-        lat = start_lat + meters_to_degrees(y_rot, start_lat)
-        lon = start_lon + meters_to_degrees(x_rot, start_lat)
-        waypoints_global.append((lat, lon, params.altitude))
+    # Hold the altitude above ground instead of above home
+    if params.terrain_dir:
+        terrain = TerrainModel(params.terrain_dir, params.terrain_cache_tiles)
+        waypoints_global, spray_mask = follow_terrain(
+            waypoints_global, spray_mask, terrain, params, start_lat, start_lon)
     
     # Conditionally add spray points
     waypoints_with_sprays, spray_points = add_spray_points(
         waypoints_global,
         params.spray_interval_m,
         start_lat,
-        params.enable_spray
+        params.enable_spray,
+        spray_mask
     )
     
     # Prepare mission items
-    mission_items = []
-    current_seq = 0
-    
-    for i, wp in enumerate(waypoints_with_sprays):
-        mission_items.append({
-            'seq': current_seq,
-            'frame': mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT,
-            'command': mavutil.mavlink.MAV_CMD_NAV_WAYPOINT,
-            'current': 0,
-            'autocontinue': 1,
-            'param1': 0,
-            'param2': 0,
-            'param3': 0,
-            'param4': 0,
-            'x': wp[0],
-            'y': wp[1],
-            'z': wp[2],
-            'is_spray': False
-        })
-        current_seq += 1
+    mission_items = build_mission_items(waypoints_with_sprays, spray_points, params)
+    
+    # Fly stripes and transit fast and turns slow
+    if params.speed_schedule:
+        before = estimate_mission(mission_items, params, start_lat, start_lon)['time_s']
+        mission_items = schedule_speeds(mission_items, params, start_lat, start_lon)
+        after = estimate_mission(mission_items, params, start_lat, start_lon)['time_s']
+        print(f"Speed schedule: ~{before / 60:.1f} min -> ~{after / 60:.1f} min "
+              f"({(before - after) / before:.0%} shorter)")
+    return mission_items
+
+def fence_and_rally(waypoints_rotated, params, start_lat, start_lon):
+    """Global (lat, lon) fence vertices and (lat, lon, altitude) rally points"""
+    fence = params.geofence
+    if not fence and params.upload_fence:
+        fence = fence_polygon(params, waypoints_rotated)
+    if fence is None or len(fence) < 3:
+        return None, []
+    
+    rally = rally_points(fence, params.rally_count, params.fence_margin_m / 2) if params.upload_fence else []
+    fence_global = [point[:2] for point in to_global(fence, params, start_lat, start_lon)]
+    return fence_global, to_global(rally, params, start_lat, start_lon)
+
+def upload_sorties(handler, mission_items, params, start_lat, start_lon, fence=None, rally=()):
+    """Upload a mission, split into sorties if it exceeds the battery or item limit.
+
+    With upload_fence set, the fence and rally points go up with the first sortie.
+    Returns the items of the last sortie uploaded, the one the vehicle flies next.
+    """
+    estimate = estimate_mission(mission_items, params, start_lat, start_lon)
+    print(f"Estimated flight: {estimate['time_s'] / 60:.1f} min, {estimate['energy_wh']:.0f} Wh, "
+          f"{estimate['length_m'] / 1000:.2f} km")
+    
+    sorties = split_sorties(mission_items, params, start_lat, start_lon, estimate['eta_s'])
+    
+    # Check every sortie before anything goes over the radio
+    for i, sortie in enumerate(sorties):
+        report = validate_mission(sortie, params, fence)
+        for issue in report['warnings']:
+            print(f"Warning (sortie {i + 1}): {issue['message']}")
+        if not report['ok']:
+            for issue in report['errors']:
+                print(f"Error (sortie {i + 1}): {issue['message']}")
+            raise MissionValidationError(report)
+    
+    for i, sortie in enumerate(sorties):
+        if i > 0:
+            input(f"Land and swap the battery, then press Enter to upload sortie {i + 1}/{len(sorties)}...")
+        if len(sorties) > 1:
+            print(f"Uploading sortie {i + 1}/{len(sorties)} with {len(sortie)} items")
+        if i == 0 and params.upload_fence and fence:
+            handler.upload_all(sortie, build_fence_items(fence), build_rally_items(rally))
+        else:
+            handler.upload_mission(sortie, fence=fence)
+    return sorties[-1]
+
+def resume_on_board(handler, position, params):
+    """Point the vehicle at the leg nearest position within the mission it already has on board"""
+    on_board = handler.download_mission()
+    if len(on_board) < 2:
+        raise RuntimeError("No mission on board to resume, use resume_mode 'trim'")
+    target = jump_target(on_board, params, *position)
+    if target is None:
+        raise RuntimeError("No sprayed leg in the mission on board, use resume_mode 'trim'")
+    for command, *command_params in target['commands']:
+        handler.commander.command(command, *command_params)
+    arrived = handler.dispatcher.expect('MISSION_ITEM_REACHED', handler.target_system,
+                                        lambda msg: msg.seq == target['start'])
+    try:
+        handler.set_current(target['start'])
+        print(f"Jumped to item {target['start']}, flying again the leg where spraying stopped "
+              f"({target['distance_m']:.0f} m away)")
+        if not target['on_arrival']:
+            return
+        
+        # The item that turned the spray on was skipped, so turn it on once the leg starts
+        print(f"Waiting up to {params.resume_reach_timeout_s:.0f} s to reach item {target['start']} "
+              "and turn the spray on")
+        if arrived.get(params.resume_reach_timeout_s) is None:
+            raise RuntimeError(f"Item {target['start']} was not reached within {params.resume_reach_timeout_s:.0f} s, "
+                               "the spray is still off")
+        for command, *command_params in target['on_arrival']:
+            handler.commander.command(command, *command_params)
+    finally:
+        arrived.close()
+
+def resume_from(handler, mission_items, params, start_lat, start_lon):
+    """Mission items to upload to resume where spraying stopped, or None once the vehicle has been sent there"""
+    position = params.resume_position
+    if position is None and params.tlog_dir:
+        tlogs = glob.glob(os.path.join(params.tlog_dir, '*.tlog'))
+        if tlogs:
+            position = last_spray_position(max(tlogs, key=os.path.getmtime), params)
+    if position is None:
+        print("No position to resume from, uploading the whole mission")
+        return mission_items
+    
+    # The mission on board may be a sortie or a trimmed upload, so index that one rather than mission_items
+    if params.resume_mode == 'set_current':
+        resume_on_board(handler, position, params)
+        return None
+    
+    hit = MissionIndex(mission_items, params, start_lat, start_lon).nearest(*position)
+    if hit is None:
+        return mission_items
+    print(f"Resuming on the leg to item {hit['seq']}, {hit['distance_m']:.0f} m from where spraying stopped")
+    entry = (hit['lat'], hit['lon'], mission_items[hit['seq']]['z'])
+    return trim_mission(mission_items, hit['seq'], params, start_lat, start_lon, entry)
+
+def track_flight(handler, mission_items, params, start_lat, start_lon):
+    """Print the mission progress and field area sprayed so far from live telemetry, until Ctrl+C"""
+    trackers = []
+    if params.track_progress:
+        progress = MissionProgress(mission_items, params, start_lat, start_lon)
+        trackers.append(progress)
+    if params.track_coverage and not params.fields:
+        outline = field_outline(params.shape_type, params.radius_m, params.rotation_deg, params.field_polygon)
+        coverage = CoverageTracker(outline, params, start_lat, start_lon)
+        trackers.append(coverage)
+    if not trackers:
+        return
+    
+    last_print = 0
+    try:
+        with handler.dispatcher.subscribe(['GLOBAL_POSITION_INT', 'SERVO_OUTPUT_RAW', 'MISSION_CURRENT',
+                                           'MISSION_ITEM_REACHED']) as messages:
+            while True:
+                msg = messages.get(timeout=1)
+                if msg is not None:
+                    for tracker in trackers:
+                        tracker.handle(msg)
+                if time.time() - last_print > 5:
+                    if params.track_progress:
+                        print(f"Item {progress.current}/{len(mission_items) - 1}: {progress.percent_complete:.1f}% done, "
+                              f"{progress.remaining_m / 1000:.2f} km and ~{progress.remaining_s / 60:.1f} min to go")
+                    if params.track_coverage and not params.fields:
+                        print(f"Sprayed {coverage.percent_covered:.1f}% of the field")
+                    last_print = time.time()
+    except KeyboardInterrupt:
+        print("Tracking stopped")
+
+def main():
+    params = MissionParams()
+    connection_strings = params.fleet_connection_strings or [params.connection_string]
+    handlers = [MissionHandler(connection_string, params) for connection_string in connection_strings]
+    handler = handlers[0]
+    
+    # Get current position
+    msg = handler.dispatcher.wait('GLOBAL_POSITION_INT')
+    start_lat = msg.lat / 1e7
+    start_lon = msg.lon / 1e7
+    
+    if params.auto_pattern:
+        candidates = optimize_pattern(params)
+        if len(handlers) > 1:
+            # The fleet split only divides zigzag stripes, so pick among those
+            candidates = [c for c in candidates if c['pattern_type'] == 'zigzag']
+        best = candidates[0]
+        params.pattern_type = best['pattern_type']
+        params.rotation_deg = best['rotation_deg']
+        print(f"Selected {best['pattern_type']} at {best['rotation_deg']:.0f}°: "
+              f"{best['length_m']:.0f} m, {best['turns']} turns, ~{best['time_s'] / 60:.1f} min, "
+              f"{best['coverage_pct']:.0f}% covered")
+    
+    # Split the field across the fleet, one mission per vehicle
+    if len(handlers) > 1:
+        ignored = []
+        if params.pattern_type != 'zigzag':
+            ignored.append(f"pattern_type {params.pattern_type}")
+        if params.fields:
+            ignored.append(f"{len(params.fields)} fields")
+        if ignored:
+            print(f"Fleet split only supports zigzag stripes over a single field, ignoring {' and '.join(ignored)}")
+        missions = partition_coverage(params, len(handlers), params.fleet_balance)
+        fence, rally = fence_and_rally(
+            [point for mission in missions for point in mission['waypoints']], params, start_lat, start_lon)
+        for vehicle, (handler, mission) in enumerate(zip(handlers, missions)):
+            print(f"Vehicle {vehicle}: {mission['stripes']} stripes, ~{mission['time_s'] / 60:.1f} min")
+            mission_items = build_mission(mission['waypoints'], mission['spray_mask'], params, start_lat, start_lon)
+            upload_sorties(handler, mission_items, params, start_lat, start_lon, fence, rally)
+        print(f"Mission completed: {params.shape_type} pattern split across {len(missions)} vehicles")
+        return
+    
+    # Generate rotated waypoints
+    spray_mask = None
+    if params.fields:
+        waypoints_rotated, spray_mask = plan_fields(
+            params.fields, params, start_lat, start_lon, params.return_to_start)
+    else:
+        waypoints_rotated = generate_pattern(
+            params.shape_type,
+            params.pattern_type,
+            params.radius_m,
+            params.stripe_separation_m,
+            params.rotation_deg,
+            params.field_polygon
+        )
+        if params.pattern_type == 'zigzag':
+            end = (0, 0) if params.return_to_start else None
+            segments = zigzag_stripes(waypoints_rotated)
+            if params.optimize_stripe_order:
+                segments = order_stripes(segments, (0, 0), end, params.turn_radius_m)
+                waypoints_rotated, spray_mask = stripe_path(segments, (0, 0), end)
+            
+            # Fly the turns between stripes within the fixed-wing turn radius
+            if params.dubins_turns and params.turn_radius_m > 0:
+                before = estimate_path(waypoints_rotated, params)['time_s']
+                waypoints_rotated, spray_mask = dubins_stripe_path(
+                    segments, (0, 0), end, params.turn_radius_m, params.acceptance_radius_m)
+                after = estimate_path(waypoints_rotated, params)['time_s']
+                print(f"Dubins turns: ~{before / 60:.1f} min with sharp turns, ~{after / 60:.1f} min flyable")
         
-        # Only add spray commands if enabled
-        if params.enable_spray:
-            for spray_seq, spray_pos in spray_points:
-                if spray_seq == i:
-                    mission_items.append({
-                        'seq': current_seq,
-                        'frame': mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT,
-                        'command': mavutil.mavlink.MAV_CMD_DO_SET_SERVO,
-                        'current': 0,
-                        'autocontinue': 1,
-                        'param1': params.servo_channel,
-                        'param2': params.servo_pwm,
-                        'param3': 0,
-                        'param4': 0,
-                        'x': spray_pos[0],
-                        'y': spray_pos[1],
-                        'z': spray_pos[2],
-                        'is_spray': True
-                    })
-                    current_seq += 1
+        if params.analyze_coverage:
+            outline = field_outline(params.shape_type, params.radius_m, params.rotation_deg, params.field_polygon)
+            report = analyze_coverage(waypoints_rotated, spray_mask, outline, params.spray_width_m,
+                                      params.coverage_cell_m)
+            print(f"Coverage: {report['coverage_pct']:.1f}% of {report['field_area_m2'] / 1e4:.1f} ha, "
+                  f"overlap {report['overlap_pct']:.1f}%, {len(report['gaps'])} gaps")
+            for gap in report['gaps'][:5]:
+                print(f"  Gap of {gap['area_m2']:.0f} m² around ({gap['x']:.0f}, {gap['y']:.0f}) m")
+    
+    mission_items = build_mission(waypoints_rotated, spray_mask, params, start_lat, start_lon)
+    fence, rally = fence_and_rally(waypoints_rotated, params, start_lat, start_lon)
+    
+    # Pick up where an interrupted run stopped spraying
+    if params.resume_mission:
+        mission_items = resume_from(handler, mission_items, params, start_lat, start_lon)
+        if mission_items is None:
+            return
     
     # Upload mission
-    handler.upload_mission(mission_items)
+    uploaded = upload_sorties(handler, mission_items, params, start_lat, start_lon, fence, rally)
     print(f"Mission completed: {params.shape_type} pattern with {'spray' if params.enable_spray else 'no spray'}")
+    
+    track_flight(handler, uploaded, params, start_lat, start_lon)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,23 @@
+from config import MissionParams
+from mavlink import MavlinkRouter
+
+def print_stats(stats):
+    for name, counters in stats.items():
+        print(f"{name}: rx {counters['rx_packets']} ({counters['rx_rate']:.0f}/s), "
+              f"tx {counters['tx_packets']} ({counters['tx_rate']:.0f}/s), "
+              f"dropped {counters['tx_dropped']}, skipped {counters['rx_skipped_bytes']} B")
+
+def main():
+    params = MissionParams()
+    connection_strings = [params.router_master] + params.router_outputs
+    router = MavlinkRouter(connection_strings)
+    print(f"Routing {params.router_master} to {len(params.router_outputs)} outputs")
+    try:
+        router.run(report=print_stats)
+    except KeyboardInterrupt:
+        print_stats(router.stats())
+    finally:
+        router.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+from contextlib import asynccontextmanager
+import asyncio
+import os
+import time
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, HTMLResponse
+from pymavlink import mavutil
+from config import MissionParams
+from mavlink import (TelemetryListener, TelemetryHub, MessageDispatcher, VehicleStatePublisher, TlogRecorder, TlogReader,
+                     ReplayConnection, mission_item)
+from planning import MissionProgress
+
+params = MissionParams()
+
+if params.telemetry_connection_string.endswith('.tlog'):
+    # Replay a recorded flight through the same listener, faster than real time if asked
+    connection = TlogReader(params.telemetry_connection_string).replay(params.replay_speed)
+else:
+    connection = mavutil.mavlink_connection(params.telemetry_connection_string)
+# Wait for the first heartbeat to set the system and component ID of remote system for the link
+connection.wait_heartbeat()
+print("Heartbeat from system (system %u component %u)" % (connection.target_system, connection.target_component))
+
+# Reads the connection on its own thread, keeping recent messages per type
+listener = TelemetryListener(connection)
+hub = TelemetryHub(params.telemetry_max_rate_hz, listener.logs.maxlen, lambda msg: f"Received MAVLink message: {msg}")
+# Routes acks and mission replies to the requests waiting for them
+dispatcher = MessageDispatcher(listener)
+# Progress of the mission on the vehicle, once it has been downloaded
+progress = None
+
+def broadcast(batch):
+    # Runs on the listener thread; the hub coalesces and pushes to clients
+    hub.publish(listener.snapshot())
+    if progress is not None:
+        hub.publish({"progress": progress.status()})
+    # Messages are only formatted when a /logs client reads them
+    hub.append_logs(batch[-listener.logs.maxlen:])
+
+@asynccontextmanager
+async def lifespan(app):
+    hub.attach(asyncio.get_running_loop())
+    listener.subscribe(broadcast)
+    # Other local processes read the latest state from shared memory instead of parsing the stream
+    publisher = None
+    if params.shared_state_name:
+        publisher = VehicleStatePublisher(params.shared_state_name, listener)
+    recorder = None
+    if params.tlog_dir:
+        os.makedirs(params.tlog_dir, exist_ok=True)
+        recorder = TlogRecorder(os.path.join(params.tlog_dir, time.strftime("%Y%m%d-%H%M%S") + ".tlog"), listener)
+        print("Recording to " + recorder.path)
+    listener.start()
+    print("Connected to " + params.telemetry_connection_string)
+    yield
+    listener.stop()
+    if publisher is not None:
+        publisher.close()
+    if recorder is not None:
+        recorder.close()
+
+app = FastAPI(lifespan=lifespan)
+
+def send_command(command, *command_params, timeout=3):
+    # Register for the ack before sending, so a fast reply is not missed
+    ack = dispatcher.expect('COMMAND_ACK', connection.target_system, lambda msg: msg.command == command)
+    message = connection.mav.command_long_encode(
+        connection.target_system,  # Target system ID
+        connection.target_component,  # Target component ID
+        command,  # Command
+        0,
+        *command_params
+    )
+    connection.mav.send(message)
+    response = ack.get(timeout)
+    if response and response.result == mavutil.mavlink.MAV_RESULT_ACCEPTED:
+        print("Command accepted")
+    else:
+        print("Command failed")
+    return response
+
+def vtol_takeoff():
+    try:
+        send_command(mavutil.mavlink.MAV_CMD_NAV_VTOL_TAKEOFF, 0, 0, 0, 0, 0, 50, 0)
+    except Exception as e:
+        print(f"Error: {e}")
+
+def vtol_land():
+    try:
+        send_command(mavutil.mavlink.MAV_CMD_NAV_VTOL_LAND, 0, 0, 0, 0, 0, 0, 0)
+    except Exception as e:
+        print(f"Error: {e}")
+
+def download_mission(timeout=5):
+    """Mission items on the vehicle, in the format the mission builder produces"""
+    if isinstance(connection, ReplayConnection):
+        # A recording can't answer requests, so use the mission it saw transferred
+        return connection.recorded_mission()
+    mission_items = []
+    with dispatcher.subscribe(['MISSION_COUNT', 'MISSION_ITEM', 'MISSION_ITEM_INT'], connection.target_system) as replies:
+        # Request list of waypoints, then each waypoint in turn
+        connection.waypoint_request_list_send()
+        msg = replies.get(timeout)
+        while msg is not None and msg.get_type() != 'MISSION_COUNT':
+            msg = replies.get(timeout)
+        if msg is None:
+            return mission_items
+        count = msg.count
+
+        for seq in range(count):
+            connection.mav.mission_request_int_send(connection.target_system, connection.target_component, seq)
+            msg = replies.get(timeout)
+            while msg is not None and (msg.get_type() == 'MISSION_COUNT' or msg.seq != seq):
+                msg = replies.get(timeout)
+            if msg is None:
+                break
+
+            scale = 1e7 if msg.get_type() == 'MISSION_ITEM_INT' else 1
+            item = mission_item(msg.seq, msg.command, msg.x / scale, msg.y / scale, msg.z,
+                                msg.param1, msg.param2, msg.param3, msg.param4)
+            item['frame'] = msg.frame
+            mission_items.append(item)
+
+        connection.mav.mission_ack_send(
+            connection.target_system, connection.target_component, mavutil.mavlink.MAV_MISSION_ACCEPTED)
+
+    return mission_items
+
+# Function to read waypoints
+def read_waypoints():
+    return [
+        {"Seq": item['seq'], "Lat": item['x'], "Lon": item['y'], "Alt": item['z'], "Command": item['command']}
+        for item in download_mission()
+    ]
+
+def load_progress():
+    # ArduPilot keeps home at seq 0 of the mission it reports
+    global progress
+    mission_items = download_mission()
+    if len(mission_items) < 2:
+        return None
+    tracker = MissionProgress(mission_items, params, mission_items[0]['x'], mission_items[0]['y'])
+    # Start from the latest state instead of waiting for the next messages
+    tracker.handle_batch([listener.latest[msg_type] for msg_type in ('MISSION_CURRENT', 'GLOBAL_POSITION_INT')
+                          if msg_type in listener.latest])
+    listener.subscribe(tracker.handle_batch)
+    if progress is not None:
+        listener.unsubscribe(progress.handle_batch)
+    progress = tracker
+    return progress
+
+# FastAPI endpoints
+@app.get("/")
+def read_root():
+    return {"message": "MAVLink listener is running. Check /logs-page for MAVLink messages."}
+
+@app.post("/stabilize")
+def stabilize():
+    try:
+        # Construct the MAVLink message
+        # QSTABILIZE mode in ArduPilot is custom mode 1
+        custom_mode = 1
+        base_mode = mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED
+
+        # Send the command
+        connection.mav.set_mode_send(
+            connection.target_system,
+            base_mode,
+            custom_mode,
+        )
+
+        print("QSTABILIZE mode command sent.")
+    except Exception as e:
+        print(f"Error: {e}")
+    return {"message": "takeoff command sent."}
+
+@app.post("/takeoff")
+def takeoff():
+    vtol_takeoff()
+    return {"message": "takeoff command sent."}
+
+@app.post("/land")
+def land():
+    vtol_land()
+    return {"message": "land command sent."}
+
+@app.get("/waypoints")
+def waypoints_read():
+    waypoints = read_waypoints()
+    return {"waypoints": waypoints}
+
+@app.get("/progress")
+def progress_read():
+    # Downloads the mission on first use
+    tracker = progress or load_progress()
+    if tracker is None:
+        return {"message": "No mission on the vehicle."}
+    return tracker.status()
+
+@app.post("/progress/reload")
+def progress_reload():
+    # Call after uploading a new mission
+    tracker = load_progress()
+    if tracker is None:
+        return {"message": "No mission on the vehicle."}
+    return tracker.status()
+
+@app.get("/stats")
+def stats():
+    # Messages received per type since start
+    return {"received": listener.received, "counts": dict(listener.counts), "clients": hub.clients}
+
+@app.get("/logs")
+async def logs():
+    # Push new log lines as they arrive
+    async def generate_logs():
+        async for lines in hub.log_lines():
+            yield "".join(f"data: {line}\n\n" for line in lines)
+
+    return StreamingResponse(generate_logs(), media_type="text/event-stream")
+
+@app.get("/logs-page")
+def logs_page():
+    # Serve an HTML page to display logs
+    html_content = """
+    <html>
+        <head>
+            <title>MAVLink Logs</title>
+            <style>
+                #logs {
+                    font-family: monospace;
+                    white-space: pre;
+                    background-color: #f4f4f4;
+                    padding: 10px;
+                    border: 1px solid #ccc;
+                    max-height: 400px;
+                    overflow-y: auto;
+                }
+            </style>
+        </head>
+        <body>
+            <h1>MAVLink Logs</h1>
+            <div id="logs"></div>
+            <script>
+                const logElement = document.getElementById("logs");
+                const maxRows = 100;
+
+                const eventSource = new EventSource("/logs");
+                eventSource.onmessage = function(event) {
+                    // Add new log entry
+                    const logEntry = document.createElement("div");
+                    logEntry.textContent = event.data;
+                    logElement.appendChild(logEntry);
+
+                    // Remove old rows if exceeding maxRows
+                    while (logElement.children.length > maxRows) {
+                        logElement.removeChild(logElement.firstChild);
+                    }
+
+                    // Auto-scroll to the bottom
+                    logElement.scrollTop = logElement.scrollHeight;
+                };
+            </script>
+        </body>
+    </html>
+    """
+    return HTMLResponse(content=html_content)
+
+@app.get("/telemetry")
+def telemetry_page():
+    # Serve an HTML page to display telemetry data
+    html_content = """
+    <html>
+        <head>
+            <title>Telemetry Data</title>
+            <style>
+                body {
+                    font-family: Arial, sans-serif;
+                    margin: 20px;
+                }
+                table {
+                    width: 100%;
+                    border-collapse: collapse;
+                }
+                th, td {
+                    padding: 10px;
+                    border: 1px solid #ddd;
+                    text-align: left;
+                }
+                th {
+                    background-color: #f4f4f4;
+                }
+            </style>
+        </head>
+        <body>
+            <h1>Telemetry Data</h1>
+            <table>
+                <thead>
+                    <tr>
+                        <th>Parameter</th>
+                        <th>Value</th>
+                    </tr>
+                </thead>
+                <tbody id="telemetry-data">
+                    <tr><td>Accelerometer (X)</td><td id="accel-x">0</td></tr>
+                    <tr><td>Accelerometer (Y)</td><td id="accel-y">0</td></tr>
+                    <tr><td>Accelerometer (Z)</td><td id="accel-z">0</td></tr>
+                    <tr><td>Gyroscope (X)</td><td id="gyro-x">0</td></tr>
+                    <tr><td>Gyroscope (Y)</td><td id="gyro-y">0</td></tr>
+                    <tr><td>Gyroscope (Z)</td><td id="gyro-z">0</td></tr>
+                    <tr><td>Speed (m/s)</td><td id="speed">0</td></tr>
+                    <tr><td>Altitude (m)</td><td id="altitude">0</td></tr>
+                    <tr><td>Heading (°)</td><td id="heading">0</td></tr>
+                </tbody>
+            </table>
+            <script>
+                const fields = {
+                    "accelero.x": "accel-x", "accelero.y": "accel-y", "accelero.z": "accel-z",
+                    "gyro.x": "gyro-x", "gyro.y": "gyro-y", "gyro.z": "gyro-z",
+                    "speed": "speed", "altitude": "altitude", "heading": "heading"
+                };
+                const eventSource = new EventSource("/telemetry-stream");
+                eventSource.onmessage = function(event) {
+                    try {
+                        // Only the values that changed are sent
+                        const data = JSON.parse(event.data);
+                        for (const [key, value] of Object.entries(data)) {
+                            const element = document.getElementById(fields[key]);
+                            if (element) {
+                                element.textContent = value.toFixed(2);
+                            }
+                        }
+                    } catch (error) {
+                        console.error("Error parsing telemetry data:", error); // Debugging line
+                    }
+                };
+                eventSource.onerror = function(error) {
+                    console.error("EventSource failed:", error); // Debugging line
+                };
+            </script>
+        </body>
+    </html>
+    """
+    return HTMLResponse(content=html_content)
+
+@app.get("/telemetry-stream")
+async def telemetry_stream():
+    # Push the full state once, then JSON deltas when values change
+    async def generate_telemetry():
+        async for delta in hub.state_deltas():
+            yield f"data: {hub.encode_json(delta)}\n\n"
+
+    return StreamingResponse(generate_telemetry(), media_type="text/event-stream")
+
+@app.websocket("/ws/telemetry")
+async def telemetry_socket(websocket: WebSocket):
+    # Text frames carry new key names ({"keys": [...]}) and non-numeric values,
+    # binary frames pack numeric values as little-endian (uint16 key index, float64) pairs
+    await websocket.accept()
+    known_keys = 0
+    try:
+        async for delta in hub.state_deltas():
+            new_keys, frame, other = hub.encode_binary(delta, known_keys)
+            if new_keys:
+                await websocket.send_text(hub.encode_json({"keys": new_keys}))
+                known_keys += len(new_keys)
+            if frame:
+                await websocket.send_bytes(frame)
+            if other:
+                await websocket.send_text(other)
+    except WebSocketDisconnect:
+        pass
+
+# Run the FastAPI app
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=8000)